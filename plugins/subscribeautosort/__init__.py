@@ -1,20 +1,21 @@
+import hashlib
+import json
+import time
 from datetime import datetime,timedelta
 from typing import Any, List, Dict, Tuple, Optional
 from app.plugins import _PluginBase
-import pytz
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
 from app.schemas import MediaType
 from app.schemas.types import EventType
 from app.core.event import eventmanager, Event
 from app.core.config import settings
 from app.log import logger
-from app.modules.themoviedb.tmdbapi import TmdbApi
 from app.db.subscribe_oper import SubscribeOper
 from app.db.userconfig_oper import UserConfigOper
 from app.db.models.subscribe import Subscribe
 from app.db.user_oper import UserOper
 
+from .airdatecache import AirDateCache
+
 
 class SubscribeAutoSort(_PluginBase):
     # 插件名称
@@ -24,7 +25,7 @@ class SubscribeAutoSort(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/joseplin0/MoviePilot-Plugins/main/icons/s_order.png"
     # 插件版本
-    plugin_version = "1.4.0"
+    plugin_version = "1.8.3"
     # 插件作者
     plugin_author = "joseplin0"
     # 作者主页
@@ -52,18 +53,37 @@ class SubscribeAutoSort(_PluginBase):
     _sort_position = "top"  # 排序位置：top-置顶，down-置底
     _sort_field = "air_date"  # 排序字段：air_date-上映日期，vote_average-评分，popularity-热度
     _users = []  # 选择的用户列表
+    _user_profiles_text = ""  # 用户排序配置原文
+    _user_profiles = {}  # 用户名 -> (排序字段, 排序方向, 排序位置)，未配置的用户使用全局设置
     _all_subscribes:List[Subscribe]= []
-    subscribe_oper = None
+    # 服务实例，首次使用时创建
+    _tmdb = None
+    _subscribe_oper = None
+    _user_config_oper = None
+    _user_oper = None
+    # 用户选项缓存有效期（秒），系统没有用户变更事件，过期或遇到未知用户时重新查询
+    _USERS_TTL = 300
+    _users_cache: List[Tuple[str, str, bool]] = []  # (用户ID, 用户名, 是否管理员)
+    _users_cache_time = 0.0
     # 上映日期缓存键名
     _AIR_DATE_CACHE_KEY = "air_date_cache"
-    _air_date_cache = {}  # 上映日期缓存
+    _air_date_cache: Optional[AirDateCache] = None  # 上映日期缓存
+    # 订阅指纹键名，定时排序时跳过订阅未变化的用户
+    _FINGERPRINT_KEY = "sort_fingerprints"
+    # 已支持的排序字段
+    _SUPPORTED_SORT_FIELDS = ("air_date",)
+    _seeded_ids = set()  # 已从订阅添加事件获取上映日期的订阅，下一次预获取时不请求TMDB
+    # 定时执行时同一订阅请求TMDB上映日期的最小间隔（秒）
+    _AIR_DATE_REFRESH_SECONDS = 6 * 3600
+    _air_date_requested: Dict[int, float] = {}  # 订阅ID -> 上次请求TMDB的时间
 
     def init_plugin(self, config: dict = None):
-        self.tmdb = TmdbApi()
-        # 初始化数据库操作
-        self.subscribe_oper = SubscribeOper()
-        self.userConfig_oper = UserConfigOper()
-        self.user_oper = UserOper()
+        # 保存配置后重新查询用户
+        self._users_cache_time = 0.0
+        self._seeded_ids = set()
+        self._air_date_requested = {}
+        # 上映日期缓存，首次使用时加载
+        self._air_date_cache = AirDateCache(self._AIR_DATE_CACHE_KEY, self.get_data, self.save_data, self.del_data)
         # 初始化插件
         if not config:
             return
@@ -77,6 +97,8 @@ class SubscribeAutoSort(_PluginBase):
         self._sort_position = config.get("sort_position")
         self._sort_field = config.get("sort_field") or 'air_date'
         self._users = config.get("users") or []
+        self._user_profiles_text = config.get("user_profiles") or ""
+        self._user_profiles = self.__parse_user_profiles(self._user_profiles_text)
         self.__update_config()
 
         if self._enabled:
@@ -84,6 +106,8 @@ class SubscribeAutoSort(_PluginBase):
 
             if self._onlyonce:
                 logger.info(f"订阅自动排序服务，立即运行一次")
+                import pytz
+                from apscheduler.schedulers.background import BackgroundScheduler
                 self._scheduler = BackgroundScheduler(timezone=settings.TZ)
                 self._scheduler.add_job(func=self.subscribe_auto_sort, trigger='date',
                                         run_date=datetime.now(tz=pytz.timezone(settings.TZ)) + timedelta(seconds=3),
@@ -99,6 +123,42 @@ class SubscribeAutoSort(_PluginBase):
     def get_state(self) -> bool:
         return self._enabled
 
+    @property
+    def tmdb(self):
+        if self._tmdb is None:
+            from app.modules.themoviedb.tmdbapi import TmdbApi
+            self._tmdb = TmdbApi()
+        return self._tmdb
+
+    @property
+    def subscribe_oper(self) -> SubscribeOper:
+        if self._subscribe_oper is None:
+            self._subscribe_oper = SubscribeOper()
+        return self._subscribe_oper
+
+    @property
+    def userConfig_oper(self) -> UserConfigOper:
+        if self._user_config_oper is None:
+            self._user_config_oper = UserConfigOper()
+        return self._user_config_oper
+
+    @property
+    def user_oper(self) -> UserOper:
+        if self._user_oper is None:
+            self._user_oper = UserOper()
+        return self._user_oper
+
+    def _get_users(self, refresh: bool = False) -> List[Tuple[str, str, bool]]:
+        """
+        获取所有用户的 (用户ID, 用户名, 是否管理员)，结果缓存一段时间
+        :param refresh: 是否忽略缓存重新查询
+        """
+        if refresh or time.monotonic() - self._users_cache_time >= self._USERS_TTL:
+            self._users_cache = [(str(user.id), user.name, bool(user.is_superuser))
+                                 for user in self.user_oper.list()]
+            self._users_cache_time = time.monotonic()
+        return self._users_cache
+
     def __update_config(self):
         # 保存配置
         self.update_config(
@@ -110,11 +170,40 @@ class SubscribeAutoSort(_PluginBase):
                 "sort_position": self._sort_position,
                 "sort_field": self._sort_field,
                 "users": self._users,
+                "user_profiles": self._user_profiles_text,
                 "is_monitor":self._is_monitor,
                 "notify":self._notify
             }
         )
 
+    def __parse_user_profiles(self, text: str) -> Dict[str, Tuple[str, str, str]]:
+        """
+        解析用户排序配置，每行格式为：用户名:排序方向:排序位置[:排序字段]
+        """
+        profiles = {}
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            parts = [part.strip() for part in line.split(":")]
+            if len(parts) not in (3, 4) or parts[1] not in ("asc", "desc") or parts[2] not in ("top", "down"):
+                logger.warning(f"无效的用户排序配置: {line}")
+                continue
+            username, sort_order, sort_position = parts[:3]
+            sort_field = parts[3] if len(parts) == 4 and parts[3] else self._sort_field
+            if sort_field not in self._SUPPORTED_SORT_FIELDS:
+                logger.warning(f"用户排序配置中的排序字段 {sort_field} 暂不支持，"
+                               f"可用：{'/'.join(self._SUPPORTED_SORT_FIELDS)}，已忽略: {line}")
+                continue
+            profiles[username] = (sort_field, sort_order, sort_position)
+        return profiles
+
+    def _get_user_profile(self, username: str) -> Tuple[str, str, str]:
+        """
+        获取用户的排序设置
+        :return: (排序字段, 排序方向, 排序位置)
+        """
+        return self._user_profiles.get(username) or (self._sort_field, self._sort_order, self._sort_position)
+
     @eventmanager.register(EventType.SubscribeAdded, priority=9999)
     def on_subscribe_add(self, event: Event):
         """
@@ -129,7 +218,9 @@ class SubscribeAutoSort(_PluginBase):
         if not self._is_monitor:
             logger.info("插件未启用监听订阅功能，跳过处理")
             return
-        mediainfo_dict: Dict = event.event_data.get("mediainfo")
+        mediainfo_dict: Dict = event.event_data.get("mediainfo") or {}
+        # 排序前先从事件数据中获取上映日期，避免再次请求TMDB
+        self._seed_air_date(event.event_data.get("subscribe_id"), mediainfo_dict)
         media_type = mediainfo_dict.get("type")
         logger.info(f"收到{media_type}{mediainfo_dict.get('title')}订阅添加事件")
         if media_type:
@@ -156,12 +247,11 @@ class SubscribeAutoSort(_PluginBase):
         username = None
         # 通过用户ID获取用户名
         if userid:
-            # 获取所有用户
-            all_users = self.user_oper.list()
-            # 在用户列表中查找对应userid的用户
-            for user_data in all_users:
-                if str(user_data.id) == str(userid):
-                    username = user_data.name
+            # 在用户列表中查找对应userid的用户，缓存中没有时可能是新用户，重新查询一次
+            for refresh in (False, True):
+                username = next((name for user_id, name, _ in self._get_users(refresh)
+                                 if user_id == str(userid)), None)
+                if username:
                     break
         msg_text = self.subscribe_auto_sort(username=username)
         self.post_message(channel=channel, title="订阅排序",
@@ -200,8 +290,7 @@ class SubscribeAutoSort(_PluginBase):
         """
         拼装插件配置页面，需要返回两块数据：1、页面配置；2、数据结构
         """
-        all_users = self.user_oper.list()
-        user_options = [{"title": user.name, "value": user.name} for user in all_users]
+        user_options = [{"title": name, "value": name} for _, name, _ in self._get_users()]
 
         return [
             {
@@ -407,6 +496,29 @@ class SubscribeAutoSort(_PluginBase):
                             },
                         ]
                     },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'user_profiles',
+                                            'label': '用户排序配置',
+                                            'placeholder': 'admin:desc:top',
+                                            'hint': '每行一个用户，格式为：用户名:排序方向(asc/desc):排序位置(top/down)[:排序字段(air_date)]，排序字段可省略，未配置的用户使用上面的设置',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
                     {
                         'component': 'VRow',
                         'content': [
@@ -425,7 +537,7 @@ class SubscribeAutoSort(_PluginBase):
                                         'content': [
                                             {
                                                 'component': 'span',
-                                                'text': '自动按上映日期对订阅进行排序，支持手动执行和定时执行'
+                                                'text': '自动按上映日期对订阅进行排序，支持手动执行和定时执行；定时执行时只处理订阅有变化的用户，可设置较短的周期以便订阅状态变更后及时排序，已缓存的上映日期每6小时最多从TMDB刷新一次'
                                             }
                                         ]
                                     }
@@ -444,6 +556,7 @@ class SubscribeAutoSort(_PluginBase):
             "sort_field": "air_date",
             "cron": "",
             "users": [],
+            "user_profiles": "",
             "notify":False
         }
 
@@ -483,34 +596,55 @@ class SubscribeAutoSort(_PluginBase):
         """
         return [subscribe for subscribe in self._all_subscribes if subscribe.type == mtype]
 
-    def get_subscribe_by_user(self, username: str, mtype: str) -> List[Subscribe]:
+    def get_subscribe_by_user(self, username: str, mtype: str, is_superuser: Optional[bool] = None) -> List[Subscribe]:
         """
-        获取用户的订阅
+        获取用户的订阅，从已加载的所有订阅中过滤
         管理员可以获取所有用户的订阅
+        :param is_superuser: 用户是否为管理员，为空时查询
         """
-        # 检查用户是否为管理员
-        user = self.user_oper.get_by_name(name=username)
-        if user and user.is_superuser:
+        if is_superuser is None:
+            user = self.user_oper.get_by_name(name=username)
+            is_superuser = bool(user and user.is_superuser)
+        if is_superuser:
             # 管理员获取所有用户的订阅，并根据 mtype 过滤
             subscribes = self.get_subscribe_by_type(mtype)
         else:
             # 普通用户只获取自己的订阅
-            subscribes = self.subscribe_oper.list_by_username(mtype=mtype, username=username)
+            subscribes = [subscribe for subscribe in self.get_subscribe_by_type(mtype)
+                          if subscribe.username == username]
         logger.debug(f"用户{username}{mtype}订阅：{len(subscribes)}个")
         return subscribes or []
 
-    def sort_queue_by_user(self, username: str,mtype: str = MediaType.TV.value) -> bool:
+    def sort_queue_by_user(self, username: str,mtype: str = MediaType.TV.value,
+                           subscribes: Optional[List[Subscribe]] = None,
+                           profile: Optional[Tuple[str, str, str]] = None,
+                           sort_values: Optional[Dict[int, Any]] = None) -> str:
         """
         根据用户的排序配置对订阅列表进行排序
         :param username: 用户名
         :param mtype: 订阅类型
+        :param subscribes: 用户的订阅，为空时重新获取
+        :param profile: 排序设置，为空时使用用户的排序设置
+        :param sort_values: 订阅ID到排序字段值的映射，为空时逐个获取
+        :return: 结果消息
         """
+        return self.__sort_queue(username, mtype, subscribes, profile, sort_values)[1]
+
+    def __sort_queue(self, username: str, mtype: str, subscribes: Optional[List[Subscribe]],
+                     profile: Optional[Tuple[str, str, str]],
+                     sort_values: Optional[Dict[int, Any]]) -> Tuple[bool, str]:
+        """
+        对用户的订阅排序
+        :return: 是否成功、结果消息
+        """
+        sort_field, sort_order, sort_position = profile or self._get_user_profile(username)
 
         # 获取所有订阅
-        subscribes = self.get_subscribe_by_user(username,mtype)
+        if subscribes is None:
+            subscribes = self.get_subscribe_by_user(username,mtype)
         if len(subscribes) <= 1:
             logger.info(f"用户{username}{mtype}订阅数量不足，无需排序")
-            return f"{mtype}订阅数量不足，无需排序"
+            return True, f"{mtype}订阅数量不足，无需排序"
 
         logger.info(f"用户{username}{mtype}订阅开始处理 {len(subscribes)} 个订阅的排序")
         # 获取当前的排序配置
@@ -518,7 +652,7 @@ class SubscribeAutoSort(_PluginBase):
         if orders is None:
             # 如果获取配置失败，记录错误并返回
             logger.error(f"用户{username}{mtype}订阅获取排序配置失败，任务终止")
-            return f"{mtype}订阅获取排序配置失败，任务终止"
+            return False, f"{mtype}订阅获取排序配置失败，任务终止"
 
         logger.debug(f"用户{username}{mtype}订阅当前排序配置: {orders}")
         if not orders:
@@ -527,27 +661,30 @@ class SubscribeAutoSort(_PluginBase):
             orders = [{"id": subscribe.id} for subscribe in subscribes]
             logger.debug(f"用户{username}{mtype}订阅生成默认排序配置")
 
+        if sort_values is None:
+            sort_values = {subscribe.id: self._get_sort_field_value(subscribe.id, sort_field)
+                           for subscribe in subscribes}
+
         subscribes_with_sort_data = []
         subscribes_without_sort_data = []
 
         for subscribe in subscribes:
-            sort_value = self._get_sort_field_value(subscribe.id)
-            if sort_value:
+            if sort_values.get(subscribe.id):
                 subscribes_with_sort_data.append(subscribe)
                 logger.debug(f"用户{username}{mtype}订阅 {subscribe.name} 需要排序")
-        else:
-            subscribes_without_sort_data.append(subscribe)
-            logger.debug(f"用户{username}{mtype}订阅 {subscribe.name} 不需要排序")
+            else:
+                subscribes_without_sort_data.append(subscribe)
+                logger.debug(f"用户{username}{mtype}订阅 {subscribe.name} 不需要排序")
 
         # 根据选择的排序字段对有数据的订阅进行排序
-        reverse = self._sort_order == "desc"
+        reverse = sort_order == "desc"
         sorted_by_field = sorted(
             subscribes_with_sort_data,
-            key=lambda x: self._get_sort_field_value(x.id),
+            key=lambda x: sort_values[x.id],
             reverse=reverse
         )
-        order_text = "正序" if self._sort_order == "asc" else "倒序"
-        logger.debug(f"用户{username}{mtype}订阅 按{self._sort_field}{order_text}排序后的: {[s.id for s in sorted_by_field]}")
+        order_text = "正序" if sort_order == "asc" else "倒序"
+        logger.debug(f"用户{username}{mtype}订阅 按{sort_field}{order_text}排序后的: {[s.id for s in sorted_by_field]}")
 
         # 创建新的排序配置：有排序数据的按指定顺序排序，没有数据的保持原顺序
         new_orders = []
@@ -577,7 +714,7 @@ class SubscribeAutoSort(_PluginBase):
             if {"id": subscribe.id} not in new_orders:
                 new_without_order.append({"id": subscribe.id})
 
-        if self._sort_position == "top":
+        if sort_position == "top":
             new_orders = new_orders + new_without_order
         else:
             new_orders = new_without_order + new_orders
@@ -589,19 +726,19 @@ class SubscribeAutoSort(_PluginBase):
         logger.debug(f"用户{username}{mtype}订阅排序配置已保存，共 {len(new_orders)} 个订阅")
 
         logger.info(f"用户{username}{mtype}订阅自动排序任务执行完成，排序方向: {order_text}")
-        return f"{mtype}订阅排序配置已保存"
+        return True, f"{mtype}订阅排序配置已保存"
 
-    def subscribe_auto_sort(self,types: List[str] = [MediaType.MOVIE.value, MediaType.TV.value], username: str = None) -> str:
+    def subscribe_auto_sort(self,types: List[str] = [MediaType.MOVIE.value, MediaType.TV.value], username: str = None,
+                            only_changed: bool = False) -> str:
         """
         订阅自动排序
+        :param types: 订阅类型
+        :param username: 只处理该用户
+        :param only_changed: 只处理订阅指纹与上次排序不同的用户，用于定时执行
         """
         if not self._sort_field:
             return
 
-        if self._sort_field == "air_date":
-            # 预获取上映日期并缓存
-            self._prefetch_air_dates()
-
         logger.info("开始执行订阅自动排序任务")
         if username:
             users = [username]
@@ -612,25 +749,85 @@ class SubscribeAutoSort(_PluginBase):
             logger.warning("未配置用户，任务终止")
             return '未配置用户，任务终止'
 
-        logger.info(f"将处理以下用户的订阅: {self._users}")
+        logger.info(f"将处理以下用户的订阅: {users}")
 
-        msgList = []
+        # 按排序设置分组，相同设置的用户共用排序字段值
+        groups: Dict[Tuple[str, str, str], List[str]] = {}
+        for user in users:
+            groups.setdefault(self._get_user_profile(user), []).append(user)
+        fields = {profile[0] for profile in groups}
 
-        for username in self._users:
-            msgList.append(f"用户{username}：")
-            for mtype in types:
-                logger.info(f"用户{username}{mtype}订阅开始排序")
-                result_msg = self.sort_queue_by_user(username,mtype)
-                msgList.append(result_msg)
+        if "air_date" in fields:
+            # 预获取上映日期并缓存，定时执行时已缓存的日期按间隔刷新
+            self._prefetch_air_dates(refresh=not only_changed)
+        else:
+            self.get_subscribe_all()
+        # 一次加载所有用户，判断管理员时不再逐个查询
+        superusers = {name for _, name, is_superuser in self._get_users(refresh=True) if is_superuser}
+
+        # 每个订阅的排序字段值只计算一次，所有使用该字段的用户共用
+        sort_values = {
+            field: {subscribe.id: self._get_sort_field_value(subscribe.id, field)
+                    for subscribe in self._all_subscribes}
+            for field in fields
+        }
+
+        msgList = []
+        fingerprints = self.get_data(self._FINGERPRINT_KEY) or {}
+        sorted_count = 0
+
+        for profile, group_users in groups.items():
+            field_values = sort_values[profile[0]]
+            for username in group_users:
+                msgList.append(f"用户{username}：")
+                for mtype in types:
+                    subscribes = self.get_subscribe_by_user(username, mtype, username in superusers)
+                    fingerprint_key = f"{username}:{mtype}"
+                    fingerprint = self._get_fingerprint(subscribes, profile, field_values)
+                    if only_changed and fingerprints.get(fingerprint_key) == fingerprint:
+                        logger.info(f"用户{username}{mtype}订阅未变化，跳过排序")
+                        msgList.append(f"{mtype}订阅未变化，跳过排序")
+                        continue
+                    logger.info(f"用户{username}{mtype}订阅开始排序")
+                    success, result_msg = self.__sort_queue(username, mtype, subscribes, profile, field_values)
+                    if success:
+                        # 排序失败时不记录指纹，下次定时执行时重试
+                        fingerprints[fingerprint_key] = fingerprint
+                    sorted_count += 1
+                    msgList.append(result_msg)
+        self.save_data(self._FINGERPRINT_KEY, fingerprints)
         # 将消息列表用换行符分隔成字符串
         msg_text = "\n".join(msgList)
-        if self._notify:
+        if self._notify and sorted_count:
             self.post_message(title='订阅排序', text=msg_text)
         return msg_text
 
-    def _prefetch_air_dates(self):
+    def _scheduled_sort(self):
+        """
+        定时排序，只处理订阅有变化的用户
+        """
+        self.subscribe_auto_sort(only_changed=True)
+
+    @staticmethod
+    def _get_fingerprint(subscribes: List[Subscribe], profile: Tuple[str, str, str],
+                         sort_values: Dict[int, Any]) -> str:
+        """
+        计算订阅指纹，订阅增删、状态、排序字段值或排序设置变化时指纹随之变化
+        :param subscribes: 用户的订阅
+        :param profile: 排序设置
+        :param sort_values: 订阅ID到排序字段值的映射
+        """
+        items = sorted(
+            [subscribe.id, subscribe.state, sort_values.get(subscribe.id)]
+            for subscribe in subscribes
+        )
+        data = [*profile, items]
+        return hashlib.md5(json.dumps(data, default=str).encode()).hexdigest()
+
+    def _prefetch_air_dates(self, refresh: bool = True):
         """
         预获取所有订阅的上映日期，并使用插件的 save_data 来缓存
+        :param refresh: 是否忽略请求间隔，定时执行时同一订阅在间隔内只请求一次TMDB
         """
         logger.info("开始预获取订阅上映日期")
         subscribes = self.get_subscribe_all()
@@ -638,27 +835,66 @@ class SubscribeAutoSort(_PluginBase):
             logger.info("没有订阅需要处理")
             return
 
-        # 加载缓存时将键转换为整数
-        cache_data = self.get_data(self._AIR_DATE_CACHE_KEY) or {}
-        self._air_date_cache = {int(k): v for k, v in cache_data.items()}
+        self._air_date_cache.load()
+        # 已删除订阅的日期不再保留
+        self._air_date_cache.prune(subscribe.id for subscribe in subscribes)
 
+        now = time.monotonic()
         for subscribe in subscribes:
+            if subscribe.id in self._seeded_ids:
+                # 刚从事件数据获取，只跳过这一次，之后仍按下面的规则从TMDB刷新
+                self._seeded_ids.discard(subscribe.id)
+                if subscribe.id in self._air_date_cache:
+                    continue
             if (subscribe.id not in self._air_date_cache) or subscribe.lack_episode == subscribe.total_episode:
+                requested = self._air_date_requested.get(subscribe.id)
+                if not refresh and requested and now - requested < self._AIR_DATE_REFRESH_SECONDS:
+                    continue
+                self._air_date_requested[subscribe.id] = now
                 air_date = self._get_air_date_from_api(subscribe)
                 if air_date:
-                    self._air_date_cache[subscribe.id] = air_date
+                    self._air_date_cache.set(subscribe.id, air_date)
 
-        # 使用插件的 save_data 方法缓存上映日期
-        self.save_data(self._AIR_DATE_CACHE_KEY, self._air_date_cache)
+        # 只写入有变化的部分
+        self._air_date_cache.save()
         logger.info(f"预获取完成，共 {len(self._air_date_cache)} 个订阅的上映日期")
 
-    def _get_sort_field_value(self, subscribeId: str) -> Optional[str]:
+    def _seed_air_date(self, subscribe_id: Optional[int], mediainfo_dict: Dict):
+        """
+        从订阅添加事件的媒体信息中获取上映日期并写入缓存，事件数据中没有时由预获取请求TMDB
+        :param subscribe_id: 订阅ID
+        :param mediainfo_dict: 事件中的媒体信息
+        """
+        if not subscribe_id or not mediainfo_dict:
+            return
+        air_date = None
+        if mediainfo_dict.get("type") == MediaType.TV.value:
+            subscribe = self.subscribe_oper.get(subscribe_id)
+            season = subscribe.season if subscribe else mediainfo_dict.get("season")
+            for season_info in mediainfo_dict.get("season_info") or []:
+                if season_info.get("season_number") == season:
+                    air_date = season_info.get("air_date")
+                    break
+        elif mediainfo_dict.get("type") == MediaType.MOVIE.value:
+            air_date = mediainfo_dict.get("release_date")
+        if not air_date:
+            logger.debug(f"订阅 {mediainfo_dict.get('title')} 事件数据中没有上映日期，排序时从TMDB获取")
+            return
+        self._air_date_cache.load()
+        self._air_date_cache.set(subscribe_id, air_date)
+        self._seeded_ids.add(int(subscribe_id))
+        self._air_date_cache.save()
+        logger.debug(f"订阅 {mediainfo_dict.get('title')} 上映日期 {air_date} 已从事件数据写入缓存")
+
+    def _get_sort_field_value(self, subscribeId: str, sort_field: Optional[str] = None) -> Optional[str]:
         """
         获取订阅的排序字段值
         :param subscribe: 订阅信息
+        :param sort_field: 排序字段，为空时使用全局设置
         :return: 排序字段值，如果获取失败返回 None
         """
-        if self._sort_field == "air_date":
+        if (sort_field or self._sort_field) == "air_date":
+            self._air_date_cache.load()
             return self._air_date_cache.get(subscribeId)
         return None
 
@@ -695,12 +931,13 @@ class SubscribeAutoSort(_PluginBase):
         }]
         """
         if self._enabled and self._cron:
+            from apscheduler.triggers.cron import CronTrigger
             return [{
                 "id": "subscribe_auto_sort",
                 "name": "订阅自动排序服务",
                 "trigger": CronTrigger.from_crontab(self._cron),
-                "func": self.subscribe_auto_sort,
-                "description": "自动按上映日期对订阅进行排序"
+                "func": self._scheduled_sort,
+                "description": "自动按上映日期对订阅进行排序，订阅未变化的用户跳过"
             }]
         return []
 
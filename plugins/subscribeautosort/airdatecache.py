@@ -0,0 +1,156 @@
+import threading
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# 日期以距 1970-01-01 的天数保存
+_EPOCH = date(1970, 1, 1).toordinal()
+
+
+class AirDateCache:
+    """
+    上映日期缓存
+    按订阅ID分桶保存到插件数据，每个桶用订阅ID和日期天数两个平行数组表示，
+    保存时只写入有变化的桶；首次加载旧版本的 {订阅ID: 日期字符串} 格式时自动迁移
+    订阅事件线程和排序线程会同时写入，加载、修改和保存都加锁
+    """
+
+    # 数据格式版本
+    VERSION = 2
+
+    def __init__(self, key: str, get_data: Callable[[str], Any], save_data: Callable[[str, Any], None],
+                 del_data: Callable[[str], Any], bucket_size: int = 1000):
+        """
+        :param key: 插件数据键名，桶保存在 key.桶编号 中
+        :param get_data: 读取插件数据
+        :param save_data: 保存插件数据
+        :param del_data: 删除插件数据，用于删除已清空的桶
+        :param bucket_size: 每个桶包含的订阅ID范围
+        """
+        self._key = key
+        self._get_data = get_data
+        self._save_data = save_data
+        self._del_data = del_data
+        self._bucket_size = bucket_size
+        # 订阅ID -> 日期天数
+        self._days: Dict[int, int] = {}
+        self._buckets: set = set()
+        self._dirty: set = set()
+        self._loaded = False
+        # 插件数据中的头部是否为当前版本
+        self._header_current = False
+        self._lock = threading.Lock()
+
+    def load(self, force: bool = False):
+        """
+        从插件数据加载，已加载时跳过
+        """
+        with self._lock:
+            self.__load(force)
+
+    def __load(self, force: bool):
+        if self._loaded and not force:
+            return
+        self._days = {}
+        self._buckets = set()
+        self._dirty = set()
+        self._header_current = False
+        header = self._get_data(self._key)
+        if isinstance(header, dict) and header.get("version") == self.VERSION:
+            self._header_current = True
+            self._bucket_size = header.get("bucket_size") or self._bucket_size
+            for bucket in header.get("buckets") or []:
+                data = self._get_data(self.__bucket_key(bucket)) or {}
+                self._days.update(zip(data.get("ids") or [], data.get("days") or []))
+                self._buckets.add(bucket)
+        elif isinstance(header, dict):
+            # 旧版本格式，全部写入新格式
+            for subscribe_id, air_date in header.items():
+                self.__set(subscribe_id, air_date)
+            self.__save()
+        self._loaded = True
+
+    def get(self, subscribe_id: int) -> Optional[str]:
+        """
+        获取上映日期，格式为 YYYY-MM-DD
+        """
+        days = self._days.get(int(subscribe_id))
+        if days is None:
+            return None
+        return date.fromordinal(days + _EPOCH).isoformat()
+
+    def set(self, subscribe_id: int, air_date: Any):
+        """
+        设置上映日期，无法解析的日期忽略
+        """
+        with self._lock:
+            self.__set(subscribe_id, air_date)
+
+    def __set(self, subscribe_id: int, air_date: Any):
+        try:
+            days = date.fromisoformat(str(air_date)[:10]).toordinal() - _EPOCH
+        except ValueError:
+            return
+        subscribe_id = int(subscribe_id)
+        if self._days.get(subscribe_id) == days:
+            return
+        self._days[subscribe_id] = days
+        self._dirty.add(subscribe_id // self._bucket_size)
+
+    def prune(self, subscribe_ids: Iterable[int]):
+        """
+        移除不在列表中的订阅，已删除订阅的日期不再保留
+        """
+        keep = {int(subscribe_id) for subscribe_id in subscribe_ids}
+        with self._lock:
+            for subscribe_id in [subscribe_id for subscribe_id in self._days if subscribe_id not in keep]:
+                del self._days[subscribe_id]
+                self._dirty.add(subscribe_id // self._bucket_size)
+
+    def save(self):
+        """
+        保存有变化的桶，删除已清空的桶，桶列表变化时同时更新头部
+        写入完成后才清除本次保存的桶的变化标记，中途失败时下次重新保存
+        """
+        with self._lock:
+            self.__save()
+
+    def __save(self):
+        if not self._dirty:
+            return
+        entries: Dict[int, List[int]] = {bucket: [] for bucket in self._dirty}
+        for subscribe_id in self._days:
+            bucket = subscribe_id // self._bucket_size
+            if bucket in entries:
+                entries[bucket].append(subscribe_id)
+        buckets = set(self._buckets)
+        removed: List[int] = []
+        for bucket, ids in entries.items():
+            if ids:
+                ids.sort()
+                self._save_data(self.__bucket_key(bucket), {"ids": ids, "days": [self._days[i] for i in ids]})
+                buckets.add(bucket)
+            elif bucket in buckets:
+                buckets.discard(bucket)
+                removed.append(bucket)
+        # 先更新头部再删除桶，中途失败时头部不会指向已删除的桶
+        if buckets != self._buckets or not self._header_current:
+            self._save_data(self._key, {
+                "version": self.VERSION,
+                "bucket_size": self._bucket_size,
+                "buckets": sorted(buckets),
+            })
+            self._header_current = True
+        for bucket in removed:
+            self._del_data(self.__bucket_key(bucket))
+        self._buckets = buckets
+        # 只清除本次写入的桶，写入失败时抛出异常，全部保留到下次保存
+        self._dirty -= set(entries)
+
+    def __bucket_key(self, bucket: int) -> str:
+        return f"{self._key}.{bucket}"
+
+    def __contains__(self, subscribe_id: int) -> bool:
+        return int(subscribe_id) in self._days
+
+    def __len__(self) -> int:
+        return len(self._days)
@@ -0,0 +1,121 @@
+"""
+上映日期缓存存储格式对比
+
+用内存中的插件数据模拟 MoviePilot 的 get_data/save_data（按 JSON 序列化保存），
+对比旧版 {订阅ID: 日期字符串} 整体保存与分桶格式的存储大小、加载和保存耗时。
+
+在 MoviePilot 根目录运行：
+    python -m app.plugins.subscribeautosort.benchmark --entries 10000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict
+
+from .airdatecache import AirDateCache
+
+
+class MemoryStore:
+    """
+    内存中的插件数据，按 JSON 保存，并统计写入的字节数
+    """
+
+    def __init__(self):
+        self.data: Dict[str, str] = {}
+        self.written = 0
+
+    def get(self, key: str) -> Any:
+        value = self.data.get(key)
+        return json.loads(value) if value is not None else None
+
+    def save(self, key: str, value: Any):
+        self.data[key] = json.dumps(value)
+        self.written += len(self.data[key])
+
+    def delete(self, key: str):
+        self.data.pop(key, None)
+
+    def size(self, key: str) -> int:
+        """
+        键及其桶占用的字节数
+        """
+        return sum(len(value) for name, value in self.data.items() if name == key or name.startswith(f"{key}."))
+
+
+def best_ms(func: Callable[[], Any], repeat: int) -> float:
+    """
+    多次执行取最短耗时，单位毫秒
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 2)
+
+
+def run(entries: int, repeat: int = 20, seed: int = 1) -> Dict[str, Dict[str, float]]:
+    """
+    执行对比
+    :param entries: 缓存的订阅数量
+    :param repeat: 每项重复次数
+    """
+    rng = random.Random(seed)
+    legacy = {
+        str(subscribe_id): (date(1990, 1, 1) + timedelta(days=rng.randint(0, 13000))).isoformat()
+        for subscribe_id in rng.sample(range(1, entries * 3), entries)
+    }
+    store = MemoryStore()
+
+    # 旧格式：每次变化都整体保存
+    store.save("old", legacy)
+    old = {
+        "size": store.size("old"),
+        "load_ms": best_ms(lambda: {int(k): v for k, v in store.get("old").items()}, repeat),
+        "save_ms": best_ms(lambda: store.save("old", legacy), repeat),
+        "update_bytes": store.size("old"),
+    }
+
+    # 迁移
+    def migrate():
+        store.save("air", legacy)
+        AirDateCache("air", store.get, store.save, store.delete).load()
+
+    migrate_ms = best_ms(migrate, min(repeat, 5))
+    cache = AirDateCache("air", store.get, store.save, store.delete)
+    cache.load()
+    assert all(cache.get(int(k)) == v for k, v in legacy.items()), "迁移后的日期不一致"
+
+    def full_save():
+        cache._dirty = set(cache._buckets)
+        cache.save()
+
+    def update_one():
+        cache.set(int(rng.choice(list(legacy))), date(2030, 1, 1) + timedelta(days=rng.randint(0, 365)))
+        cache.save()
+
+    new = {
+        "size": store.size("air"),
+        "load_ms": best_ms(lambda: AirDateCache("air", store.get, store.save, store.delete).load(), repeat),
+        "save_ms": best_ms(full_save, repeat),
+        "update_ms": best_ms(update_one, repeat),
+        "migrate_ms": migrate_ms,
+    }
+    written = store.written
+    update_one()
+    new["update_bytes"] = store.written - written
+    return {"old": old, "new": new}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="上映日期缓存存储格式对比")
+    parser.add_argument("--entries", type=int, default=10000, help="缓存的订阅数量")
+    parser.add_argument("--repeat", type=int, default=20, help="每项重复次数")
+    args = parser.parse_args()
+    print(json.dumps(run(args.entries, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
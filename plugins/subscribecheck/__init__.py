@@ -1,17 +1,27 @@
 import json
+import threading
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, List, Dict, Tuple, Optional
+from typing import TYPE_CHECKING, Any, List, Dict, Tuple, Optional
 from app.plugins import _PluginBase
-from transmission_rpc import File
+from app.core.config import settings
 from app.core.context import Context
 from app.core.event import eventmanager, Event
 from app.core.metainfo import MetaInfo
+from app.db.subscribe_oper import SubscribeOper
 from app.helper.downloader import DownloaderHelper
 from app.log import logger
-from app.modules.transmission.transmission import Transmission
 from app.schemas import ServiceInfo
 from app.schemas.types import EventType
 
+from .history import CheckHistory
+
+if TYPE_CHECKING:
+    # 仅用于类型注解，运行时按需导入
+    from transmission_rpc import File, Torrent
+    from app.modules.transmission.transmission import Transmission
+
 
 class SubscribeCheck(_PluginBase):
     """
@@ -26,7 +36,7 @@ class SubscribeCheck(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/joseplin0/MoviePilot-Plugins/main/icons/s_check.png"
     # 插件版本
-    plugin_version = "1.1.1"
+    plugin_version = "1.3.3"
     # 插件作者
     plugin_author = "joseplin0"
     # 作者主页
@@ -38,8 +48,41 @@ class SubscribeCheck(_PluginBase):
     # 可使用的用户级别
     auth_level = 1
 
+    # 订阅种子记录键名
+    _TORRENTS_KEY = "subscribe_torrents"
+    # 站点删除种子的 Tracker 返回信息关键字
+    # 只匹配针对种子的提示，passkey、账号未注册等错误不能当作种子被删除
+    _DELETED_KEYWORDS = (
+        "unregistered torrent",
+        "torrent not registered",
+        "torrent is not registered",
+        "torrent not found",
+        "torrent does not exist",
+        "torrent has been deleted",
+        "torrent has been removed",
+        "torrent was deleted",
+        "torrent deleted",
+        "种子不存在",
+        "种子已被删除",
+        "种子已删除",
+        "种子未注册",
+    )
+    # 旧版本保存检查记录的插件数据键名
+    _HISTORY_KEY = "check_history"
+    # 检查记录保留条数
+    _HISTORY_LIMIT = 500
+    # 批量查询种子时需要的字段
+    _TRACKER_FIELDS = ["id", "hashString", "name", "percentDone", "error", "errorString", "trackerStats"]
+
     # 私有属性
-    downloader_helper = None
+    _downloader_helper = None
+    _scheduler = None
+    # 检查记录
+    _history: Optional[List[dict]] = None
+    _history_store: Optional[CheckHistory] = None
+    _history_lock = threading.Lock()
+    # 订阅种子记录在事件线程和定时任务中都会读写
+    _torrents_lock = threading.Lock()
 
     # 是否开启
     _enabled = False
@@ -51,7 +94,6 @@ class SubscribeCheck(_PluginBase):
         """
         初始化插件
         """
-        self.downloader_helper = DownloaderHelper()
         if not config:
             return
 
@@ -65,10 +107,40 @@ class SubscribeCheck(_PluginBase):
 
             if self._onlyonce:
                 logger.info("订阅检查服务，立即运行一次")
-                # 这里可以调用一次检查逻辑
+                import pytz
+                from apscheduler.schedulers.background import BackgroundScheduler
+                self._scheduler = BackgroundScheduler(timezone=settings.TZ)
+                self._scheduler.add_job(func=self.check_deleted_torrents, trigger='date',
+                                        run_date=datetime.now(tz=pytz.timezone(settings.TZ)) + timedelta(seconds=3),
+                                        name="检查站点删除种子")
+                # 关闭一次性开关
+                self._onlyonce = False
+                self.__update_config()
+                if self._scheduler.get_jobs():
+                    self._scheduler.print_jobs()
+                    self._scheduler.start()
 
             logger.info("订阅检查插件初始化完成")
 
+    @property
+    def downloader_helper(self) -> DownloaderHelper:
+        if self._downloader_helper is None:
+            self._downloader_helper = DownloaderHelper()
+        return self._downloader_helper
+
+    def __update_config(self):
+        """
+        保存配置
+        """
+        self.update_config(
+            {
+                "enabled": self._enabled,
+                "notify": self._notify,
+                "only_once": self._onlyonce,
+                "cron": self._cron,
+            }
+        )
+
     def get_state(self) -> bool:
         """
         获取插件状态
@@ -79,7 +151,19 @@ class SubscribeCheck(_PluginBase):
         """
         注册插件公共服务
         """
-        pass
+        return [{
+            "path": "/history",
+            "endpoint": self.get_history,
+            "methods": ["GET"],
+            "summary": "检查记录",
+            "description": "查询最近的检查记录，默认只返回需要勾选或失败的记录"
+        }, {
+            "path": "/history/stats",
+            "endpoint": self.get_history_stats,
+            "methods": ["GET"],
+            "summary": "检查统计",
+            "description": "查询检查修复率和耗时分位数"
+        }]
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -119,16 +203,145 @@ class SubscribeCheck(_PluginBase):
                                 ],
                             }
                         ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 6},
+                                "content": [
+                                    {
+                                        "component": "VCronField",
+                                        "props": {
+                                            "model": "cron",
+                                            "label": "站点删除检查周期",
+                                            "placeholder": "5位cron表达式，留空表示不检查",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 6},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "only_once",
+                                            "label": "立即检查一次",
+                                        },
+                                    }
+                                ],
+                            }
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12},
+                                "content": [
+                                    {
+                                        "component": "VAlert",
+                                        "props": {
+                                            "type": "info",
+                                            "variant": "tonal",
+                                            "text": "定时批量读取订阅种子的 Tracker 状态，发现种子已被站点删除且未下载完成时，重新搜索该订阅",
+                                        },
+                                    }
+                                ],
+                            }
+                        ],
                     }
                 ],
             }
         ], {
             "enabled": False,
             "notify": False,
+            "only_once": False,
+            "cron": "",
         }
 
     def get_page(self) -> List[dict]:
-        pass
+        """
+        拼装插件详情页面，展示修复率、耗时分位数和最近的异常记录
+        """
+        stats = self.get_history_stats()
+        cards = [
+            ("检查次数", stats["total"]),
+            ("修复率", f"{stats['fix_rate']}%"),
+            ("失败次数", stats["failed"]),
+            ("识别耗时 P50/P95/P99",
+             f"{stats['recognize_ms_p50']}/{stats['recognize_ms_p95']}/{stats['recognize_ms_p99']} ms"),
+            ("RPC耗时 P50/P95/P99",
+             f"{stats['rpc_ms_p50']}/{stats['rpc_ms_p95']}/{stats['rpc_ms_p99']} ms"),
+        ]
+        rows = [
+            {
+                "component": "tr",
+                "content": [
+                    {"component": "td", "text": datetime.fromtimestamp(record.get("time") or 0).strftime("%Y-%m-%d %H:%M:%S")},
+                    {"component": "td", "text": record.get("subscribe") or ""},
+                    {"component": "td", "text": (record.get("hash") or "")[:8]},
+                    {"component": "td", "text": f"{record.get('fixed')}/{record.get('scanned')}"},
+                    {"component": "td", "text": f"{record.get('recognize_ms')} ms"},
+                    {"component": "td", "text": f"{record.get('rpc_ms')} ms"},
+                    {"component": "td", "text": "成功" if record.get("result") else "失败"},
+                ]
+            } for record in self.get_history(limit=50)
+        ]
+        return [
+            {
+                "component": "VRow",
+                "content": [
+                    {
+                        "component": "VCol",
+                        "props": {"cols": 12, "md": 4 if index < 3 else 6},
+                        "content": [
+                            {
+                                "component": "VCard",
+                                "props": {"variant": "tonal"},
+                                "content": [
+                                    {"component": "VCardText", "text": f"{title}：{value}"}
+                                ]
+                            }
+                        ]
+                    } for index, (title, value) in enumerate(cards)
+                ]
+            },
+            {
+                "component": "VRow",
+                "content": [
+                    {
+                        "component": "VCol",
+                        "props": {"cols": 12},
+                        "content": [
+                            {
+                                "component": "VTable",
+                                "props": {"hover": True},
+                                "content": [
+                                    {
+                                        "component": "thead",
+                                        "content": [
+                                            {
+                                                "component": "tr",
+                                                "content": [
+                                                    {"component": "th", "text": text}
+                                                    for text in ("时间", "订阅", "种子", "勾选/文件", "识别耗时", "RPC耗时", "结果")
+                                                ]
+                                            }
+                                        ]
+                                    },
+                                    {"component": "tbody", "content": rows}
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
 
     @staticmethod
     def get_command() -> List[Dict[str, Any]]:
@@ -138,7 +351,16 @@ class SubscribeCheck(_PluginBase):
         """
         注册插件公共服务
         """
-        pass
+        if self._enabled and self._cron:
+            from apscheduler.triggers.cron import CronTrigger
+            return [{
+                "id": "subscribe_check_deleted",
+                "name": "站点删除种子检查",
+                "trigger": CronTrigger.from_crontab(self._cron),
+                "func": self.check_deleted_torrents,
+                "description": "检查订阅种子是否已被站点删除"
+            }]
+        return []
 
     @eventmanager.register(EventType.DownloadAdded, priority=9999)
     def handle_download_added(self, event: Event):
@@ -172,20 +394,38 @@ class SubscribeCheck(_PluginBase):
         service = self.__get_downloader_service(downloader=downloader)
         if not service:
             return
+        # 记录订阅种子，供站点删除检查使用
+        self.__save_subscribe_torrent(torrent_hash, downloader, subscribe_info, episodes)
         # 检查下载任务的文件选择状态
-        self._check_download_files(torrent_hash, episodes, service.instance, context)
+        self._check_download_files(torrent_hash, episodes, service.instance, context, subscribe_info)
         return
 
-    def _check_download_files(self, torrent_hash: str, dl_episodes: List[str], downloader: Transmission,context: Context):
+    def _check_download_files(self, torrent_hash: str, dl_episodes: List[str], downloader: "Transmission",
+                              context: Context, subscribe_info: Dict = None):
         """
         检查下载文件
         """
+        record = {
+            "time": int(time.time()),
+            "hash": torrent_hash,
+            "subscribe": (subscribe_info or {}).get("name"),
+            "scanned": 0,
+            "fixed": 0,
+            "recognize_ms": 0,
+            "rpc_ms": 0,
+            "result": None,
+        }
+        rpc_start = time.perf_counter()
         torrent_files = self.__torrent_get_files(downloader, torrent_hash)
+        record["rpc_ms"] = self.__elapsed_ms(rpc_start)
         if not torrent_files:
+            record["result"] = False
+            self._append_history(record)
             return
         logger.info(f"文件{torrent_hash}获取到{len(torrent_files)}个文件，订阅下载{dl_episodes}")
         file_ids = []
         need_checks = []
+        recognize_start = time.perf_counter()
         for file in torrent_files:
             # 识别文件集
             file_meta = MetaInfo(Path(file.name).stem)
@@ -199,17 +439,243 @@ class SubscribeCheck(_PluginBase):
                     file_ids.append(file.id)
                     need_checks.append(episode_number)
                     logger.debug(f"{file_meta.name}第{episode_number}集未勾选")
+        record["recognize_ms"] = self.__elapsed_ms(recognize_start)
+        record["scanned"] = len(torrent_files)
         if not file_ids:
             logger.info(f"订阅下载的文件不需要勾选")
+            record["result"] = True
+            self._append_history(record)
             return
         try:
+            rpc_start = time.perf_counter()
             result = downloader.set_files(torrent_hash, file_ids)
+            record["rpc_ms"] += self.__elapsed_ms(rpc_start)
+            record["fixed"] = len(file_ids) if result else 0
+            record["result"] = bool(result)
             
             self.send_result_msg(context,dl_episodes,need_checks,result=result)
         except Exception as e:
             logger.error(f"设置种子文件勾选状态失败，错误: {e}")
+            record["result"] = False
+        self._append_history(record)
         return
 
+    def _append_history(self, record: dict):
+        """
+        追加检查记录，只保留最近的 _HISTORY_LIMIT 条
+        内存中保留列表供查询，数据库中只追加一行
+        """
+        with self._history_lock:
+            history = self.__load_history()
+            history.append(record)
+            del history[:-self._HISTORY_LIMIT]
+            if self._history_store:
+                try:
+                    self._history_store.append(record)
+                except Exception as e:
+                    logger.error(f"保存检查记录失败，错误: {e}")
+
+    def __load_history(self) -> List[dict]:
+        """
+        加载检查记录，首次使用时打开记录数据库，旧版本保存在插件数据中的记录迁移到数据库
+        数据库无法打开时只保存在内存中
+        """
+        if self._history is not None:
+            return self._history
+        legacy = self.get_data(self._HISTORY_KEY) or []
+        try:
+            self._history_store = CheckHistory(self.get_data_path() / "check_history.db",
+                                               limit=self._HISTORY_LIMIT)
+            if legacy:
+                self._history_store.extend(legacy[-self._HISTORY_LIMIT:])
+                self.del_data(self._HISTORY_KEY)
+            self._history = self._history_store.load()
+        except Exception as e:
+            logger.error(f"打开检查记录数据库失败，检查记录只保存在内存中，错误: {e}")
+            self._history_store = None
+            self._history = legacy[-self._HISTORY_LIMIT:]
+        return self._history
+
+    def get_history(self, limit: int = 20, incidents: bool = True) -> List[dict]:
+        """
+        查询最近的检查记录
+        :param limit: 返回条数
+        :param incidents: 只返回需要勾选或失败的记录
+        """
+        with self._history_lock:
+            history = list(self.__load_history())
+        if incidents:
+            history = [record for record in history if record.get("fixed") or record.get("result") is False]
+        return list(reversed(history[-int(limit):])) if int(limit) > 0 else []
+
+    def get_history_stats(self) -> Dict[str, Any]:
+        """
+        统计检查记录的修复率和耗时分位数
+        """
+        with self._history_lock:
+            history = list(self.__load_history())
+        total = len(history)
+        fixed = sum(1 for record in history if record.get("fixed"))
+        failed = sum(1 for record in history if record.get("result") is False)
+        stats = {
+            "total": total,
+            "fixed": fixed,
+            "failed": failed,
+            "fix_rate": round(fixed / total * 100, 1) if total else 0,
+        }
+        for field in ("recognize_ms", "rpc_ms"):
+            values = sorted(record.get(field) or 0 for record in history)
+            for p in (50, 95, 99):
+                stats[f"{field}_p{p}"] = self.__percentile(values, p)
+        return stats
+
+    @staticmethod
+    def __percentile(values: List[float], p: int) -> float:
+        """
+        计算已排序列表的分位数（最近秩法）
+        """
+        if not values:
+            return 0
+        rank = max(1, -(-len(values) * p // 100))
+        return values[rank - 1]
+
+    @staticmethod
+    def __elapsed_ms(start: float) -> int:
+        """
+        计算从 start 到现在经过的毫秒数
+        """
+        return int((time.perf_counter() - start) * 1000)
+
+    def check_deleted_torrents(self):
+        """
+        检查订阅种子是否已被站点删除
+        每个下载器只发起一次批量查询，读取 Tracker 最近一次的返回信息，不主动汇报
+        """
+        with self._torrents_lock:
+            records: Dict[str, dict] = self.get_data(self._TORRENTS_KEY) or {}
+        if not records:
+            logger.info("没有需要检查的订阅种子")
+            return
+
+        # 按下载器分组
+        groups: Dict[str, List[str]] = {}
+        for torrent_hash, record in records.items():
+            groups.setdefault(record.get("downloader"), []).append(torrent_hash)
+
+        deleted: Dict[str, dict] = {}
+        # 不再需要检查的种子：下载完成、已从下载器删除或已被站点删除
+        finished = set()
+        for downloader, hashes in groups.items():
+            service = self.__get_downloader_service(downloader=downloader)
+            if not service:
+                continue
+            torrents = self.__torrent_get_trackers(service.instance, hashes)
+            if torrents is None:
+                continue
+            found = set()
+            for torrent in torrents:
+                found.add(torrent.hashString)
+                if torrent.percent_done >= 1:
+                    # 已下载完成的种子不受站点删除影响
+                    finished.add(torrent.hashString)
+                    continue
+                if self.is_torrent_deleted(torrent):
+                    logger.info(f"种子 {torrent.name} 已被站点删除")
+                    deleted[torrent.hashString] = records[torrent.hashString]
+            # 下载器中已不存在的种子不再检查
+            finished.update(set(hashes) - found)
+        finished.update(deleted)
+
+        # 查询期间可能有新的种子记录，重新读取后只移除已处理的种子
+        with self._torrents_lock:
+            records = self.get_data(self._TORRENTS_KEY) or {}
+            for torrent_hash in finished:
+                records.pop(torrent_hash, None)
+            self.save_data(self._TORRENTS_KEY, records)
+
+        if not deleted:
+            logger.info(f"检查完成，{len(records)} 个订阅种子待检查")
+            return
+        self._search_replacements(list(deleted.values()))
+
+    @classmethod
+    def is_torrent_deleted(cls, torrent: "Torrent") -> bool:
+        """
+        根据 Tracker 返回信息判断种子是否已被站点删除
+        :param torrent: 包含 errorString、trackerStats 字段的种子
+        """
+        messages = [torrent.error_string or ""]
+        for tracker in torrent.tracker_stats or []:
+            if not tracker.last_announce_succeeded:
+                messages.append(tracker.last_announce_result or "")
+        return cls.is_deleted_message(messages)
+
+    @classmethod
+    def is_deleted_message(cls, messages: List[str]) -> bool:
+        """
+        判断 Tracker 返回信息中是否包含种子被删除的关键字
+        """
+        for message in messages:
+            message = message.lower()
+            if any(keyword in message for keyword in cls._DELETED_KEYWORDS):
+                return True
+        return False
+
+    def _search_replacements(self, records: List[dict]):
+        """
+        将受影响的订阅合并为一批，重新搜索下载
+        :param records: 被删除种子的订阅记录
+        """
+        subscribe_oper = SubscribeOper()
+        # 同一订阅的多个种子合并处理
+        episodes_map: Dict[int, set] = {}
+        names: Dict[int, str] = {}
+        for record in records:
+            sid = record.get("subscribe_id")
+            if not sid:
+                continue
+            episodes_map.setdefault(sid, set()).update(record.get("episodes") or [])
+            names[sid] = record.get("name")
+
+        from app.chain.subscribe import SubscribeChain
+        subscribe_chain = SubscribeChain()
+        for sid, episodes in episodes_map.items():
+            subscribe = subscribe_oper.get(sid)
+            if not subscribe:
+                logger.info(f"订阅 {names.get(sid)} 已不存在，跳过重新搜索")
+                continue
+            # 已下载记录中移除被删除种子的集数，使其重新进入搜索
+            if isinstance(subscribe.note, list) and episodes:
+                note = [episode for episode in subscribe.note if episode not in episodes]
+                subscribe_oper.update(sid, {"note": note})
+            logger.info(f"订阅 {subscribe.name} 第{sorted(episodes)}集种子已被站点删除，重新搜索")
+            try:
+                subscribe_chain.search(sid=sid)
+            except Exception as e:
+                logger.error(f"订阅 {subscribe.name} 重新搜索失败，错误: {e}")
+
+        if self._notify:
+            msg_text = "\n".join(f"{names.get(sid)}：第{sorted(episodes)}集"
+                                 for sid, episodes in episodes_map.items())
+            self.post_message(title="检测到订阅种子已被站点删除", text=f"{msg_text}\n已重新搜索订阅")
+
+    def __save_subscribe_torrent(self, torrent_hash: str, downloader: str,
+                                 subscribe_info: Dict, episodes: List[int]):
+        """
+        记录订阅下载的种子
+        """
+        with self._torrents_lock:
+            records = self.get_data(self._TORRENTS_KEY) or {}
+            records[torrent_hash] = {
+                "downloader": downloader,
+                "subscribe_id": subscribe_info.get("id"),
+                "name": subscribe_info.get("name"),
+                "season": subscribe_info.get("season"),
+                "episodes": episodes,
+                "time": int(time.time()),
+            }
+            self.save_data(self._TORRENTS_KEY, records)
+
     def send_result_msg(self, context: Context, dl_episodes: List[str], need_checks: List[str], result: bool) -> None:
         """
         发送通知消息
@@ -267,7 +733,7 @@ class SubscribeCheck(_PluginBase):
             logger.error(f"{downloader} 获取下载器实例失败，请检查配置")
         return service
 
-    def __torrent_get_files(self, downloader: Transmission, torrent_hash: str) -> Optional[List[File]]:
+    def __torrent_get_files(self, downloader: "Transmission", torrent_hash: str) -> Optional[List["File"]]:
         """
         获取下载器中的种子信息
         :param downloader: 下载器实例
@@ -289,8 +755,36 @@ class SubscribeCheck(_PluginBase):
 
         return torrent_files
 
+    def __torrent_get_trackers(self, downloader: "Transmission", torrent_hashes: List[str]) -> Optional[List["Torrent"]]:
+        """
+        批量获取种子的 Tracker 状态
+        :param downloader: 下载器实例
+        :param torrent_hashes: 种子哈希列表
+        :return: 种子列表，查询失败返回 None
+        """
+        if not downloader or not downloader.trc:
+            logger.warning(f"获取下载器实例失败，请稍后重试")
+            return None
+        try:
+            return downloader.trc.get_torrents(ids=torrent_hashes, arguments=self._TRACKER_FIELDS)
+        except Exception as e:
+            logger.error(f"获取种子 Tracker 状态失败，错误: {e}")
+            return None
+
     def stop_service(self):
         """
         停止插件服务
         """
-        pass
+        try:
+            if self._scheduler:
+                self._scheduler.remove_all_jobs()
+                if self._scheduler.running:
+                    self._scheduler.shutdown()
+                self._scheduler = None
+            with self._history_lock:
+                if self._history_store:
+                    self._history_store.close()
+                self._history_store = None
+                self._history = None
+        except Exception as e:
+            logger.error(f"停止插件服务失败，错误: {e}")
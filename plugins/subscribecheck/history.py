@@ -0,0 +1,77 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, List
+
+
+class CheckHistory:
+    """
+    检查记录
+    使用 SQLite WAL 模式保存，每条记录追加一行，不整体重写；
+    超过保留条数一批后再删除最早的记录，删除的开销分摊到多次追加
+    """
+
+    def __init__(self, db_path: Path, limit: int = 500, trim_batch: int = 50):
+        """
+        :param db_path: 数据库文件路径
+        :param limit: 保留的记录条数
+        :param trim_batch: 超过保留条数多少条后删除
+        """
+        self._limit = limit
+        self._trim_batch = trim_batch
+        self._lock = threading.Lock()
+        self._closed = False
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY AUTOINCREMENT, record TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, record: dict):
+        """
+        追加一条记录
+        """
+        self.extend([record])
+
+    def extend(self, records: Iterable[dict]):
+        """
+        按顺序追加多条记录
+        """
+        rows = [(json.dumps(record, ensure_ascii=False),) for record in records]
+        with self._lock:
+            if self._closed or not rows:
+                return
+            self._conn.executemany("INSERT INTO history (record) VALUES (?)", rows)
+            self._count += len(rows)
+            if self._count > self._limit + self._trim_batch:
+                self._conn.execute(
+                    "DELETE FROM history WHERE id NOT IN (SELECT id FROM history ORDER BY id DESC LIMIT ?)",
+                    (self._limit,)
+                )
+                self._count = self._limit
+            self._conn.commit()
+
+    def load(self) -> List[dict]:
+        """
+        加载最近的记录，按追加顺序排列
+        """
+        with self._lock:
+            if self._closed:
+                return []
+            rows = self._conn.execute(
+                "SELECT record FROM (SELECT id, record FROM history ORDER BY id DESC LIMIT ?) ORDER BY id",
+                (self._limit,)
+            ).fetchall()
+        return [json.loads(record) for record, in rows]
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._conn.close()
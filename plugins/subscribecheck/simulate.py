@@ -0,0 +1,240 @@
+"""
+站点删除种子检查离线模拟
+
+在本地启动模拟的 Transmission RPC 服务，按预设的 errorString、trackerStats 返回订阅种子，
+对订阅种子记录执行 check_deleted_torrents，检查：
+- 每个下载器只发起一次 torrent-get 请求，不发起 reannounce 等其他请求
+- 被站点删除、已下载完成、下载器中已不存在和需要继续检查的种子分类正确
+- 检查期间新记录的订阅种子不会被覆盖
+
+在 MoviePilot 根目录运行：
+    python -m app.plugins.subscribecheck.simulate
+"""
+import copy
+import hashlib
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from transmission_rpc import Client
+
+from . import SubscribeCheck
+
+# 模拟的会话ID，首次请求返回 409 要求客户端带上
+SESSION_ID = "fake-session"
+
+# (名称, 下载器, 完成度, errorString, [(汇报是否成功, Tracker 返回信息)], 预期结果)
+# 预期结果：deleted 被站点删除，finished 已完成，missing 下载器中已不存在，keep 继续检查
+CASES: List[Tuple[str, str, Optional[float], str, List[Tuple[bool, str]], str]] = [
+    ("站点返回未注册", "tr-a", 0.4, "", [(False, "Unregistered torrent")], "deleted"),
+    ("中文提示已删除", "tr-a", 0.1, "", [(False, "种子已被删除")], "deleted"),
+    ("错误信息未注册", "tr-b", 0.7, "Tracker gave an error: Torrent not registered with this tracker", [],
+     "deleted"),
+    ("多个 Tracker 其一删除", "tr-b", 0.5, "", [(True, "Success"), (False, "Torrent has been deleted")],
+     "deleted"),
+    ("passkey 错误", "tr-a", 0.3, "", [(False, "Invalid passkey")], "keep"),
+    ("账号未注册", "tr-a", 0.3, "", [(False, "User not registered")], "keep"),
+    ("连接超时", "tr-b", 0.2, "", [(False, "Connection timed out")], "keep"),
+    ("汇报成功时的旧提示", "tr-b", 0.6, "", [(True, "Unregistered torrent")], "keep"),
+    ("正常下载", "tr-a", 0.9, "", [(True, "")], "keep"),
+    ("已完成且被删除", "tr-a", 1.0, "", [(False, "Unregistered torrent")], "finished"),
+    ("下载器中已删除", "tr-b", None, "", [], "missing"),
+]
+
+
+def torrent_hash(name: str) -> str:
+    return hashlib.sha1(name.encode()).hexdigest()
+
+
+class FakeTransmissionServer:
+    """
+    模拟的 Transmission RPC 服务
+    POST /transmission/rpc 支持 session-get 和 torrent-get，其他方法记录后返回成功
+    """
+
+    def __init__(self, torrents: List[dict], on_torrent_get: Optional[Callable[[], None]] = None):
+        """
+        :param torrents: 下载器中的种子，字段与 torrent-get 返回一致
+        :param on_torrent_get: 收到 torrent-get 时调用，用于模拟查询期间的新事件
+        """
+        self.torrents = {torrent["hashString"]: torrent for torrent in torrents}
+        self.on_torrent_get = on_torrent_get
+        self._lock = threading.Lock()
+        # (方法, 参数)
+        self.calls: List[Tuple[str, dict]] = []
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.__handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def count(self, method: str) -> int:
+        with self._lock:
+            return sum(1 for name, _ in self.calls if name == method)
+
+    def handle(self, method: str, arguments: dict) -> dict:
+        with self._lock:
+            self.calls.append((method, arguments))
+        if method == "session-get":
+            return {"rpc-version": 17, "rpc-version-minimum": 14, "rpc-version-semver": "5.3.0",
+                    "version": "4.0.5"}
+        if method == "torrent-get":
+            if self.on_torrent_get:
+                self.on_torrent_get()
+            ids = arguments.get("ids")
+            fields = arguments.get("fields") or []
+            torrents = [torrent for hash_string, torrent in self.torrents.items()
+                        if ids is None or hash_string in ids]
+            return {"torrents": [{field: torrent[field] for field in fields if field in torrent}
+                                 for torrent in torrents]}
+        return {}
+
+    def __handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.headers.get("X-Transmission-Session-Id") != SESSION_ID:
+                    self.__reply(409, {})
+                    return
+                arguments = server.handle(body.get("method"), body.get("arguments") or {})
+                self.__reply(200, {"result": "success", "arguments": arguments})
+
+            def __reply(self, status: int, data: Any):
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("X-Transmission-Session-Id", SESSION_ID)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class FakeDownloaderHelper:
+    """
+    模拟的下载器帮助类，按名称返回指向模拟服务的 transmission_rpc 客户端
+    """
+
+    def __init__(self, clients: Dict[str, Client]):
+        self._clients = clients
+
+    def get_service(self, name: str, type_filter: Optional[str] = None):
+        client = self._clients.get(name)
+        if not client:
+            return None
+        return SimpleNamespace(name=name, type=type_filter, instance=SimpleNamespace(trc=client))
+
+
+def build_torrent(name: str, percent_done: float, error_string: str, trackers: List[Tuple[bool, str]]) -> dict:
+    return {
+        "id": int(torrent_hash(name)[:6], 16),
+        "hashString": torrent_hash(name),
+        "name": name,
+        "percentDone": percent_done,
+        "error": 2 if error_string else 0,
+        "errorString": error_string,
+        "trackerStats": [{"lastAnnounceSucceeded": succeeded, "lastAnnounceResult": result}
+                         for succeeded, result in trackers],
+    }
+
+
+def run() -> Dict[str, Any]:
+    """
+    执行一次检查
+    :return: 检查结果和失败的断言
+    """
+    store: Dict[str, Any] = {}
+    plugin = SubscribeCheck.__new__(SubscribeCheck)
+    plugin.get_data = lambda key: copy.deepcopy(store.get(key))
+    plugin.save_data = lambda key, value: store.__setitem__(key, copy.deepcopy(value))
+    searched: List[dict] = []
+    plugin._search_replacements = searched.extend
+
+    added_hash = torrent_hash("检查期间新下载")
+
+    def add_during_check():
+        # 与 DownloadAdded 事件相同的记录方式
+        plugin._SubscribeCheck__save_subscribe_torrent(added_hash, "tr-a",
+                                                       {"id": 99, "name": "检查期间新下载"}, [1])
+
+    servers: Dict[str, FakeTransmissionServer] = {}
+    for downloader in sorted({case[1] for case in CASES}):
+        torrents = [build_torrent(name, percent_done, error_string, trackers)
+                    for name, case_downloader, percent_done, error_string, trackers, _ in CASES
+                    if case_downloader == downloader and percent_done is not None]
+        servers[downloader] = FakeTransmissionServer(
+            torrents, on_torrent_get=add_during_check if downloader == "tr-a" else None)
+        servers[downloader].start()
+
+    records = {}
+    for index, (name, downloader, _, _, _, _) in enumerate(CASES):
+        records[torrent_hash(name)] = {"downloader": downloader, "subscribe_id": index + 1, "name": name,
+                                       "season": 1, "episodes": [index + 1], "time": 0}
+    store[SubscribeCheck._TORRENTS_KEY] = records
+
+    try:
+        clients = {name: Client(host="127.0.0.1", port=server.port) for name, server in servers.items()}
+        plugin._downloader_helper = FakeDownloaderHelper(clients)
+        plugin.check_deleted_torrents()
+    finally:
+        for server in servers.values():
+            server.stop()
+
+    left = store.get(SubscribeCheck._TORRENTS_KEY) or {}
+    searched_names = sorted(record["name"] for record in searched)
+    failures = []
+    for name, _, _, _, _, expected in CASES:
+        in_search = name in searched_names
+        kept = torrent_hash(name) in left
+        if in_search != (expected == "deleted"):
+            failures.append(f"{name}：预期 {expected}，{'' if in_search else '未'}重新搜索")
+        if kept != (expected == "keep"):
+            failures.append(f"{name}：预期 {expected}，记录{'仍保留' if kept else '已移除'}")
+    if added_hash not in left:
+        failures.append("检查期间新记录的种子被覆盖")
+    calls = {}
+    for name, server in servers.items():
+        methods = sorted({method for method, _ in server.calls} - {"session-get"})
+        calls[name] = {"torrent-get": server.count("torrent-get"), "methods": methods}
+        if server.count("torrent-get") != 1:
+            failures.append(f"下载器 {name} 发起了 {server.count('torrent-get')} 次 torrent-get")
+        if methods != ["torrent-get"]:
+            failures.append(f"下载器 {name} 发起了其他请求：{methods}")
+    return {
+        "torrents": len(CASES),
+        "calls": calls,
+        "searched": searched_names,
+        "left": sorted(record["name"] for record in left.values()),
+        "failures": failures,
+    }
+
+
+def main():
+    result = run()
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    print("通过" if not result["failures"] else "失败")
+    sys.exit(0 if not result["failures"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,32 @@
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, List, Dict, Tuple, Optional
-from threading import Timer
-from app.chain.media import MediaChain
-from app.chain.transfer import TransferChain
+from typing import TYPE_CHECKING, Any, List, Dict, Tuple, Optional
 from app.core.metainfo import MetaInfoPath
+from app.db.transferhistory_oper import TransferHistoryOper
 from app.helper.directory import DirectoryHelper
 from app.helper.mediaserver import MediaServerHelper
-from app.modules.trimemedia.trimemedia import TrimeMedia
 from app.plugins import _PluginBase
-from app.schemas import ServiceInfo,TransferInfo,MediaServerConf
-from app.schemas.types import EventType
+from app.schemas import TransferInfo,MediaServerConf
+from app.schemas.types import EventType, MediaType
 from app.log import logger
 from app.core.event import eventmanager, Event
 from app.core.config import settings
+from .cache import TTLCache
+from .connection import ServerConnection
+from .metrics import ScanMetrics
+from .pathindex import PathMapper
+from .pipeline import LANE_BULK, LANE_FAST, ScanPipeline
+from .reconcile import MtimeIndex, reconcile
+from .scanqueue import ScanJournal
+from .scheduler import DebounceScheduler
+
+if TYPE_CHECKING:
+    # 目录监控依赖 watchdog，只在开启监控时导入
+    from .watcher import DirectoryWatcher
 
 
 class TrimMediaTool(_PluginBase):
@@ -27,7 +41,7 @@ class TrimMediaTool(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/joseplin0/MoviePilot-Plugins/main/icons/trimmedia.png"
     # 插件版本
-    plugin_version = "1.1.1"
+    plugin_version = "1.19.3"
     # 插件作者
     plugin_author = "joseplin0"
     # 作者主页
@@ -39,10 +53,12 @@ class TrimMediaTool(_PluginBase):
     # 可使用的用户级别
     auth_level = 1
 
-    server_helper = None
-    media_chain = None
-    directory_helper = None
-    transfer_chain = None
+    # 服务实例，首次使用时创建
+    _server_helper = None
+    _media_chain = None
+    _directory_helper = None
+    _transfer_chain = None
+    _transferhis = None
 
     _enabled = False
     _only_once = False
@@ -50,28 +66,62 @@ class TrimMediaTool(_PluginBase):
     _media_map_dirs = ""
     # 延迟扫描时间（秒）
     _delay_seconds = 10
-    # 待扫描路径队列
-    _scan_queue: dict[str, list[str]] = {}
-    # 节流扫描方法
-    _throttled_scan = None
-    _del_map = {}
+    # 最长等待时间（秒），持续有入库时也会按此间隔扫描
+    _max_wait_seconds = 60
+    # 快速通道延迟扫描时间（秒）
+    _fast_delay_seconds = 2
+    # 最近多少天内播出的剧集进入快速通道
+    _fast_days = 7
+    # 进入快速通道的单次入库文件数上限，整季入库走批量通道
+    _FAST_MAX_FILES = 3
+    # 防抖调度器，用于目录监控
+    _scheduler: Optional[DebounceScheduler] = None
+    # 以下按飞牛媒体服务器名称区分，每个服务器独立连接、排队和扫描，互不影响
+    # 媒体服务器连接
+    _connections: Dict[str, ServerConnection] = {}
+    # 扫描流程：队列、媒体库索引、扫描请求
+    _pipelines: Dict[str, ScanPipeline] = {}
+    # 扫描流程的防抖调度器
+    _schedulers: Dict[str, DebounceScheduler] = {}
+    # 扫描队列持久化日志
+    _journals: Dict[str, ScanJournal] = {}
+    # 目录对账周期，为空时不对账
+    _reconcile_cron = ""
+    # 目录修改时间索引
+    _mtime_index: Optional[MtimeIndex] = None
+    # 同一时间只运行一次对账
+    _reconcile_lock = threading.Lock()
+    # 是否监控映射目录
+    _watch_enabled = False
+    # 映射目录监控
+    _watcher: Optional["DirectoryWatcher"] = None
+    # 整理入库事件加入队列的映射目录 -> 加入时间，目录监控跳过其中已扫描的变化
+    _transfer_paths: Dict[str, float] = {}
+    _transfer_paths_lock = threading.Lock()
+    # 整理入库事件加入队列的目录保留时间（秒）
+    _TRANSFER_PATHS_SECONDS = 600
+    # 扫描流程统计键名
+    _METRICS_KEY = "scan_metrics"
+    # 扫描流程统计
+    _metrics: Optional[ScanMetrics] = None
+    # 源文件到飞牛媒体路径的缓存键名
+    _RENAME_CACHE_KEY = "rename_cache"
+    # 源文件到飞牛媒体路径的缓存，删除源文件时免去重新识别
+    _rename_cache: Optional[TTLCache] = None
+    # 同一批删除事件只查询一次整理记录
+    _resolve_lock = threading.Lock()
     # 映射目录字典
     _map_dirs: dict[str, str] = {}
-    # 缓存的服务信息
-    _cached_service_info: Optional[ServiceInfo] = None
+    # 映射目录索引，只在映射配置变化时重建
+    _path_mapper: Optional[PathMapper] = None
+    _map_dirs_source: Optional[str] = None
 
     def init_plugin(self, config: dict = None):
         """
         初始化插件
         :param config: 配置信息
         """
-        self.server_helper = MediaServerHelper()
-        self.media_chain = MediaChain()
-        self.directory_helper = DirectoryHelper()
-        self.transfer_chain = TransferChain()
-        
-        # 清除缓存，因为配置可能发生了变化
-        self._cached_service_info = None
+        self.stop_service()
 
         if not config:
             return
@@ -79,58 +129,208 @@ class TrimMediaTool(_PluginBase):
         self._enabled = config.get("enabled")
         self._only_once = config.get("only_once")
         self._media_map_dirs = config.get("media_map_dirs") or ""
-        self._delay_seconds = config.get("delay_seconds") or 10
-        # 初始化扫描队列
-        self._scan_queue = {}
+        self._delay_seconds = int(config.get("delay_seconds") or 10)
+        self._max_wait_seconds = max(int(config.get("max_wait_seconds") or 60), self._delay_seconds)
+        self._fast_delay_seconds = min(int(config.get("fast_delay_seconds") or 2), self._delay_seconds)
+        self._fast_days = int(config.get("fast_days") or 7)
+        self._reconcile_cron = config.get("reconcile_cron") or ""
+        self._watch_enabled = config.get("watch_enabled")
+        self._transfer_paths = {}
+        self._metrics = ScanMetrics()
+        self._metrics.load(self.get_data(self._METRICS_KEY))
+        # 加载删除路径缓存
+        self._rename_cache = TTLCache()
+        self._rename_cache.load(self.get_data(self._RENAME_CACHE_KEY))
 
         if self._enabled:
             logger.info("飞牛影视插件已启用")
-            # 初始化节流扫描方法 - 使用简化的防抖实现
-            self._throttled_scan = self._create_debounce(
-                interval=self._delay_seconds
-            )(self._process_scan_queue)
-
-            if not self._media_map_dirs:
-                return
-            # 查找映射目录
-            logger.debug("解析媒体库目录映射配置")
-            for dir_mapping in self._media_map_dirs.splitlines():
-                parts = dir_mapping.split(":")
-                if len(parts) == 2:
-                    source_dir, target_dir = parts
-                    self._map_dirs[source_dir] = target_dir
-                else:
-                    logger.warning(f"无效的目录映射配置: {dir_mapping}")
-        pass
+            self._scheduler = DebounceScheduler(name="TrimMediaTool")
+            # 每个飞牛媒体服务器独立的扫描流程
+            for media_config in self.get_media_configs():
+                self.__start_server(media_config.name)
+            if not self._pipelines:
+                logger.warning("无法获取飞牛媒体服务器配置，请检查配置")
+
+            self.__build_path_mapper()
+            if self._reconcile_cron:
+                self._mtime_index = self.__open_mtime_index()
+            if self._watch_enabled:
+                from .watcher import DirectoryWatcher
+                self._watcher = DirectoryWatcher(
+                    roots=list(self._map_dirs),
+                    on_change=self.__on_dir_changed,
+                    scheduler=self._scheduler,
+                    delay_seconds=self._delay_seconds,
+                    max_wait_seconds=self._max_wait_seconds,
+                )
+                self._watcher.start()
+
+            # 恢复上次未扫描的路径
+            for pipeline in self._pipelines.values():
+                pipeline.replay()
+
+    @property
+    def server_helper(self) -> MediaServerHelper:
+        if self._server_helper is None:
+            self._server_helper = MediaServerHelper()
+        return self._server_helper
 
     @property
-    def service_info(self) -> Optional[ServiceInfo]:
+    def media_chain(self):
+        if self._media_chain is None:
+            from app.chain.media import MediaChain
+            self._media_chain = MediaChain()
+        return self._media_chain
+
+    @property
+    def directory_helper(self) -> DirectoryHelper:
+        if self._directory_helper is None:
+            self._directory_helper = DirectoryHelper()
+        return self._directory_helper
+
+    @property
+    def transfer_chain(self):
+        if self._transfer_chain is None:
+            from app.chain.transfer import TransferChain
+            self._transfer_chain = TransferChain()
+        return self._transfer_chain
+
+    @property
+    def transferhis(self) -> TransferHistoryOper:
+        if self._transferhis is None:
+            self._transferhis = TransferHistoryOper()
+        return self._transferhis
+
+    def __start_server(self, name: str):
         """
-        服务信息（带缓存）
+        初始化飞牛媒体服务器的连接和扫描流程，每个服务器使用独立的调度线程和扫描线程池
         """
-        # 如果已有缓存，直接返回
-        if self._cached_service_info is not None:
-            return self._cached_service_info
+        logger.debug(f"获取飞牛影视配置: {name}")
+        connection = ServerConnection(name, self.server_helper.get_service)
+        scheduler = DebounceScheduler(name=f"TrimMediaTool-{name}")
+        # 初始化扫描队列，未扫描的路径保存在日志中
+        journal = self.__open_scan_journal(name, legacy=not self._pipelines)
+        self._connections[name] = connection
+        self._schedulers[name] = scheduler
+        if journal:
+            self._journals[name] = journal
+        self._pipelines[name] = ScanPipeline(
+            get_client=connection.client,
+            scheduler=scheduler,
+            metrics=self._metrics,
+            journal=journal,
+            delay_seconds=self._delay_seconds,
+            max_wait_seconds=self._max_wait_seconds,
+            fast_delay_seconds=self._fast_delay_seconds,
+            fast_max_wait_seconds=max(self._fast_delay_seconds * 5, 10),
+            on_error=connection.invalidate,
+            name=name,
+        )
+        # 在后台加载媒体库索引，入库事件只使用已加载的索引选择服务器
+        self._pipelines[name].refresh_library_index_async()
 
-        # 获取媒体服务器配置
-        media_config = self.get_media_config()
-        logger.debug(f"获取飞牛影视配置: {media_config.name}")
-        if not media_config or not media_config.name:
-            logger.warning("无法获取飞牛媒体服务器配置，请检查配置")
+    def __open_scan_journal(self, name: str, legacy: bool = False) -> Optional[ScanJournal]:
+        """
+        打开媒体服务器的扫描队列持久化日志，失败时只使用内存队列
+        :param legacy: 是否接管单服务器版本的日志
+        """
+        data_path = self.get_data_path()
+        safe_name = re.sub(r"[^\w.-]", "_", name)
+        db_path = data_path / f"scan_queue_{safe_name}.db"
+        legacy_path = data_path / "scan_queue.db"
+        try:
+            if legacy and legacy_path.exists() and not db_path.exists():
+                for suffix in ("", "-wal", "-shm"):
+                    source = Path(f"{legacy_path}{suffix}")
+                    if source.exists():
+                        source.rename(f"{db_path}{suffix}")
+            return ScanJournal(db_path)
+        except Exception as e:
+            logger.error(f"打开媒体服务器 {name} 扫描队列日志失败，重启后未扫描的路径将丢失：{str(e)}")
             return None
 
-        service: ServiceInfo = self.server_helper.get_service(media_config.name)
-        if not service:
-            logger.warning(f"无法获取媒体服务器 {media_config.name}，请检查配置")
+    def __open_mtime_index(self) -> Optional[MtimeIndex]:
+        """
+        打开目录修改时间索引，失败时不对账
+        """
+        try:
+            return MtimeIndex(self.get_data_path() / "mtime_index.db")
+        except Exception as e:
+            logger.error(f"打开目录修改时间索引失败，跳过目录对账：{str(e)}")
             return None
 
-        if service.instance.is_inactive():
-            logger.warning(f"媒体服务器 {service.name} 未连接，请检查配置")
-            return None
+    def __on_dir_changed(self, path: str, changed_at: float):
+        """
+        映射目录发生变化，转换为飞牛路径后加入扫描队列
+        映射目录就是整理入库的目标目录，整理入库事件在变化之后已加入队列的目录不再重复扫描
+        :param changed_at: 目录最后一次变化的时间
+        """
+        self._metrics.incr("watch_changed")
+        if self.__transfer_enqueued_since(path, changed_at):
+            logger.debug(f"目录 {Path(path).name} 已由整理入库事件加入扫描队列，跳过")
+            self._metrics.incr("watch_skipped")
+            return
+        self._add_to_scan_queue(self.get_mp_path(path))
+
+    def __record_transfer_path(self, path: str):
+        """
+        记录整理入库事件加入队列的目录，清理超过保留时间的记录
+        """
+        now = time.monotonic()
+        path = path.rstrip("/")
+        with self._transfer_paths_lock:
+            # 重新插入，保持按加入时间排序
+            self._transfer_paths.pop(path, None)
+            self._transfer_paths[path] = now
+            while self._transfer_paths:
+                oldest = next(iter(self._transfer_paths))
+                if now - self._transfer_paths[oldest] <= self._TRANSFER_PATHS_SECONDS:
+                    break
+                del self._transfer_paths[oldest]
+
+    def __transfer_enqueued_since(self, path: str, changed_at: float) -> bool:
+        """
+        目录或其上级目录是否在最后一次变化之后由整理入库事件加入了扫描队列
+        """
+        path = path.rstrip("/")
+        with self._transfer_paths_lock:
+            while path:
+                enqueued_at = self._transfer_paths.get(path)
+                if enqueued_at is not None and enqueued_at >= changed_at:
+                    return True
+                path = path.rsplit("/", 1)[0] if "/" in path else ""
+        return False
+
+    def __build_path_mapper(self):
+        """
+        解析媒体库目录映射配置，构建映射索引
+        """
+        if self._path_mapper is not None and self._map_dirs_source == self._media_map_dirs:
+            return
+        logger.debug("解析媒体库目录映射配置")
+        map_dirs = {}
+        for dir_mapping in self._media_map_dirs.splitlines():
+            if not dir_mapping.strip():
+                continue
+            parts = dir_mapping.split(":")
+            if len(parts) == 2:
+                source_dir, target_dir = parts
+                map_dirs[source_dir.strip()] = target_dir.strip()
+            else:
+                logger.warning(f"无效的目录映射配置: {dir_mapping}")
+        self._map_dirs = map_dirs
+        self._path_mapper = PathMapper(map_dirs)
+        self._map_dirs_source = self._media_map_dirs
+
+    def _probe_service(self):
+        """
+        定时探测飞牛连接，断开或未连接时重连，重连后处理积压的扫描队列
+        """
+        for name, connection in list(self._connections.items()):
+            pipeline = self._pipelines.get(name)
+            if connection.probe() and pipeline:
+                pipeline.resume()
 
-        # 缓存服务信息
-        self._cached_service_info = service
-        return service
     def get_state(self) -> bool:
         """
         获取插件状态
@@ -147,7 +347,13 @@ class TrimMediaTool(_PluginBase):
         """
         获取插件API
         """
-        pass
+        return [{
+            "path": "/metrics",
+            "endpoint": self.get_metrics,
+            "methods": ["GET"],
+            "summary": "扫描统计",
+            "description": "获取事件、队列和飞牛扫描请求的统计数据"
+        }]
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -174,6 +380,124 @@ class TrimMediaTool(_PluginBase):
                         }
                       },
                     ]
+                  },
+                  {
+                    "component": "VCol",
+                    "props": {
+                      "cols": 12,
+                      "md": 6
+                    },
+                    "content": [
+                      {
+                        "component": "VSwitch",
+                        "props": {
+                          "model": "watch_enabled",
+                          "label": "监控映射目录",
+                          "hint": "其他程序在映射目录中增删文件时也触发飞牛扫描，目录过多时改用轮询",
+                          "persistent-hint": True
+                        }
+                      },
+                    ]
+                  }
+                ]
+              },
+              {
+                "component": "VRow",
+                "content": [
+                  {
+                    "component": "VCol",
+                    "props": {
+                      "cols": 12,
+                      "md": 6
+                    },
+                    "content": [
+                      {
+                        "component": "VTextField",
+                        "props": {
+                          "model": "delay_seconds",
+                          "label": "延迟扫描时间（秒）",
+                          "type": "number",
+                          "hint": "最后一次入库后等待多久再扫描，期间的请求会合并",
+                          "persistent-hint": True
+                        }
+                      },
+                    ]
+                  },
+                  {
+                    "component": "VCol",
+                    "props": {
+                      "cols": 12,
+                      "md": 6
+                    },
+                    "content": [
+                      {
+                        "component": "VTextField",
+                        "props": {
+                          "model": "max_wait_seconds",
+                          "label": "最长等待时间（秒）",
+                          "type": "number",
+                          "hint": "持续有入库时，最多等待多久扫描一次",
+                          "persistent-hint": True
+                        }
+                      },
+                    ]
+                  },
+                  {
+                    "component": "VCol",
+                    "props": {
+                      "cols": 12,
+                      "md": 6
+                    },
+                    "content": [
+                      {
+                        "component": "VTextField",
+                        "props": {
+                          "model": "fast_delay_seconds",
+                          "label": "快速通道延迟扫描时间（秒）",
+                          "type": "number",
+                          "hint": "最近播出的剧集单集入库时使用的延迟，不受批量入库影响",
+                          "persistent-hint": True
+                        }
+                      },
+                    ]
+                  },
+                  {
+                    "component": "VCol",
+                    "props": {
+                      "cols": 12,
+                      "md": 6
+                    },
+                    "content": [
+                      {
+                        "component": "VTextField",
+                        "props": {
+                          "model": "fast_days",
+                          "label": "快速通道播出天数",
+                          "type": "number",
+                          "hint": "最近多少天内播出过新集的剧集进入快速通道",
+                          "persistent-hint": True
+                        }
+                      },
+                    ]
+                  },
+                  {
+                    "component": "VCol",
+                    "props": {
+                      "cols": 12,
+                      "md": 6
+                    },
+                    "content": [
+                      {
+                        "component": "VCronField",
+                        "props": {
+                          "model": "reconcile_cron",
+                          "label": "目录对账周期",
+                          "placeholder": "5位cron表达式，留空表示不对账",
+                          "hint": "对比映射目录的修改时间，扫描在 MoviePilot 之外发生变化的目录",
+                          "persistent-hint": True
+                        }
+                      },
+                    ]
                   }
                 ]
               },
@@ -223,6 +547,12 @@ class TrimMediaTool(_PluginBase):
         ], {
             "enabled": False,
             "only_once": False,
+            "delay_seconds": 10,
+            "max_wait_seconds": 60,
+            "fast_delay_seconds": 2,
+            "fast_days": 7,
+            "reconcile_cron": "",
+            "watch_enabled": False,
             "media_map_dirs": ""
         }
 
@@ -230,7 +560,117 @@ class TrimMediaTool(_PluginBase):
         """
         获取插件页面
         """
-        pass
+        metrics = self.get_metrics()
+        if not metrics:
+            return [{"component": "div", "text": "暂无数据", "props": {"class": "text-center"}}]
+        counters = metrics["counters"]
+        histograms = metrics["histograms"]
+        wait = histograms.get("debounce_wait") or {}
+        fast_wait = histograms.get(f"debounce_wait_{LANE_FAST}") or {}
+        cards = [
+            ("整理入库事件", counters.get("event_transfer", 0)),
+            ("删除源文件事件", counters.get("event_deleted", 0)),
+            ("加入队列", counters.get("enqueued", 0)),
+            ("合并路径", counters.get("deduplicated", 0)),
+            ("未匹配媒体库", counters.get("unmatched", 0)),
+            ("丢弃路径", counters.get("dropped", 0)),
+            ("扫描中暂存路径", counters.get("held", 0)),
+            ("对账变化目录", counters.get("reconcile_changed", 0)),
+            ("监控变化目录", counters.get("watch_changed", 0)),
+            ("监控跳过目录", counters.get("watch_skipped", 0)),
+            ("当前队列", metrics["queue_depth"]),
+            ("防抖等待 P50/P95", f"{wait.get('p50', 0)}/{wait.get('p95', 0)} 秒"),
+            ("快速通道入队", counters.get(f"enqueued_{LANE_FAST}", 0)),
+            ("快速通道等待 P50/P95", f"{fast_wait.get('p50', 0)}/{fast_wait.get('p95', 0)} 秒"),
+        ]
+        rows = [
+            {
+                "component": "tr",
+                "content": [
+                    {"component": "td", "text": library["name"]},
+                    {"component": "td", "text": library["requests"]},
+                    {"component": "td", "text": f"{library['failure_rate']}%"},
+                    {"component": "td", "text": f"{library['p50']} 秒"},
+                    {"component": "td", "text": f"{library['p95']} 秒"},
+                ]
+            } for library in metrics["libraries"].values()
+        ]
+        return [
+            {
+                "component": "VRow",
+                "content": [
+                    {
+                        "component": "VCol",
+                        "props": {"cols": 6, "md": 3},
+                        "content": [
+                            {
+                                "component": "VCard",
+                                "props": {"variant": "tonal"},
+                                "content": [
+                                    {"component": "VCardText", "text": f"{title}：{value}"}
+                                ]
+                            }
+                        ]
+                    } for title, value in cards
+                ]
+            },
+            {
+                "component": "VRow",
+                "content": [
+                    {
+                        "component": "VCol",
+                        "props": {"cols": 12},
+                        "content": [
+                            {
+                                "component": "VApexChart",
+                                "props": {
+                                    "height": 240,
+                                    "options": {
+                                        "chart": {"type": "line"},
+                                        "title": {"text": "队列长度"},
+                                        "xaxis": {"type": "datetime"},
+                                    },
+                                    "series": [{
+                                        "name": "队列长度",
+                                        "data": [[ts * 1000, depth] for ts, depth in metrics["depth"]]
+                                    }]
+                                }
+                            }
+                        ]
+                    }
+                ]
+            },
+            {
+                "component": "VRow",
+                "content": [
+                    {
+                        "component": "VCol",
+                        "props": {"cols": 12},
+                        "content": [
+                            {
+                                "component": "VTable",
+                                "props": {"hover": True},
+                                "content": [
+                                    {
+                                        "component": "thead",
+                                        "content": [
+                                            {
+                                                "component": "tr",
+                                                "content": [
+                                                    {"component": "th", "text": text}
+                                                    for text in ("媒体库", "扫描请求", "失败率", "耗时 P50", "耗时 P95")
+                                                ]
+                                            }
+                                        ]
+                                    },
+                                    {"component": "tbody", "content": rows}
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
 
     @eventmanager.register(EventType.DownloadFileDeleted)
     def on_event(self, event: Event):
@@ -252,23 +692,85 @@ class TrimMediaTool(_PluginBase):
             return
         
         logger.debug(f"源文件删除,{Path(src).name}")
+        self._metrics.incr("event_deleted")
         
-        # 先检查是否已在删除映射中
-        if hash in self._del_map:
+        fn_media_path = self._resolve_deleted_path(src, hash)
+        if fn_media_path:
             # 将路径添加到扫描队列
-            self._add_to_scan_queue(self._del_map[hash])
-            return
-        
-        # 通过源路径获取重命名后的路径
+            self._add_to_scan_queue(fn_media_path)
+        return
+
+    def _resolve_deleted_path(self, src: str, download_hash: str) -> Optional[str]:
+        """
+        获取删除的源文件对应的飞牛媒体路径
+        依次使用缓存、整理记录，都没有时才重新识别媒体
+        :param src: 源文件路径
+        :param download_hash: 下载哈希
+        """
+        # 整理入库时已记录了源文件对应的媒体路径
+        fn_media_path = self.__get_cached_rename(src, download_hash)
+        if fn_media_path:
+            return fn_media_path
+
+        with self._resolve_lock:
+            # 同一种子的其他文件可能已经查询过整理记录
+            fn_media_path = self.__get_cached_rename(src, download_hash)
+            if fn_media_path:
+                return fn_media_path
+            fn_media_path = self.__resolve_by_history(src, download_hash)
+            if fn_media_path:
+                return fn_media_path
+
+        # 没有整理记录，通过源路径获取重命名后的路径
+        logger.debug(f"{Path(src).name} 没有整理记录，重新识别媒体")
         target_path = self.get_rename_dir(src)
         if not target_path:
-            return
+            return None
         fn_media_path = self.get_mp_path(str(target_path))
         if fn_media_path:
-            self._del_map[hash] = fn_media_path
-            # 将路径添加到扫描队列
-            self._add_to_scan_queue(fn_media_path)
-        return
+            self.__cache_rename(fn_media_path, src=src, download_hash=download_hash)
+        return fn_media_path
+
+    def __get_cached_rename(self, src: str, download_hash: str) -> Optional[str]:
+        return self._rename_cache.get(f"src:{src}") or self._rename_cache.get(f"hash:{download_hash}")
+
+    def __resolve_by_history(self, src: str, download_hash: str) -> Optional[str]:
+        """
+        按下载哈希一次查出种子所有文件的整理记录，写入缓存
+        """
+        try:
+            histories = self.transferhis.list_by_hash(download_hash=download_hash) or []
+        except Exception as e:
+            logger.error(f"查询整理记录失败：{str(e)}")
+            return None
+        fn_media_path = None
+        for history in histories:
+            if not history.status or not history.src or not history.dest:
+                continue
+            media_root = self.__get_media_root(history.dest, history.type)
+            history_path = self.get_mp_path(str(media_root))
+            self.__cache_rename(history_path, src=history.src, download_hash=download_hash)
+            if history.src == src or not fn_media_path:
+                fn_media_path = history_path
+        if fn_media_path:
+            logger.debug(f"通过整理记录获取到 {len(histories)} 个文件的媒体路径")
+        return fn_media_path
+
+    @staticmethod
+    def __get_media_root(dest: str, mtype: str) -> Path:
+        """
+        根据重命名格式获取整理后文件所在的媒体根目录
+        """
+        dest_path = Path(dest)
+        try:
+            media_root = DirectoryHelper.get_media_root_path(
+                rename_format=settings.RENAME_FORMAT(MediaType(mtype)),
+                rename_path=dest_path,
+            )
+        except Exception as e:
+            logger.debug(f"获取媒体根目录失败：{str(e)}")
+            media_root = None
+        return media_root or dest_path.parent
 
     @eventmanager.register(EventType.TransferComplete)
     def refresh(self, event: Event):
@@ -279,6 +781,7 @@ class TrimMediaTool(_PluginBase):
             return
         
         logger.info("收到整理入库完成事件")
+        self._metrics.incr("event_transfer")
         
         if not self._media_map_dirs:
             logger.debug("未配置媒体库目录映射，跳过刷新媒体库操作")
@@ -289,7 +792,7 @@ class TrimMediaTool(_PluginBase):
             return
 
         # 刷新媒体库
-        if not self.service_info:
+        if not self._pipelines:
             return
         # 入库数据
         transferinfo: TransferInfo = event_info.get("transferinfo")
@@ -298,104 +801,86 @@ class TrimMediaTool(_PluginBase):
         # /downloads/link/anime/诛仙 (2022)/
         mp_target_path = transferinfo.target_diritem.path
         fn_media_path = self.get_mp_path(mp_target_path)
+
+        # 记录源文件对应的媒体路径，删除源文件时直接使用
+        fileitem = event_info.get("fileitem")
+        self.__cache_rename(fn_media_path, src=fileitem.path if fileitem else None,
+                            download_hash=event_info.get("download_hash"))
         
-        # 将路径添加到扫描队列
-        self._add_to_scan_queue(fn_media_path)
+        # 将路径添加到扫描队列，最近播出的剧集走快速通道
+        self._add_to_scan_queue(fn_media_path, lane=self.__transfer_lane(event_info))
+        if self._watcher:
+            self.__record_transfer_path(mp_target_path)
 
+    def __transfer_lane(self, event_info: dict) -> str:
+        """
+        判断入库使用的扫描通道
+        标记为 interactive 的入库，以及最近播出的剧集的少量文件入库走快速通道，其余走批量通道
+        """
+        if event_info.get("interactive"):
+            return LANE_FAST
+        mediainfo = event_info.get("mediainfo")
+        transferinfo: TransferInfo = event_info.get("transferinfo")
+        if not mediainfo or mediainfo.type != MediaType.TV:
+            return LANE_BULK
+        if transferinfo and (transferinfo.file_count or 0) > self._FAST_MAX_FILES:
+            return LANE_BULK
+        last_air_date = (mediainfo.tmdb_info or {}).get("last_air_date")
+        if not last_air_date:
+            return LANE_BULK
+        try:
+            aired = datetime.strptime(last_air_date, "%Y-%m-%d")
+        except ValueError:
+            return LANE_BULK
+        if datetime.now() - aired <= timedelta(days=self._fast_days):
+            return LANE_FAST
+        return LANE_BULK
 
-    def _scan_media(self, library_guid: str, media_paths: List[str]) -> bool:
+    def __cache_rename(self, fn_media_path: str, src: Optional[str] = None, download_hash: Optional[str] = None):
         """
-        扫描媒体文件
-        :param media_path: 媒体路径
-        :return: 是否成功
-        """        
-        # 获取媒体库信息
-        trimemedia: TrimeMedia = self.service_info.instance
-        trimemedia.api.task_running()
-        data = { "dir_list": media_paths }
-        if (res := trimemedia.api.request(f"/mdb/scan/{library_guid}", method="post", data=data)) and res.success:
-            logger.debug(f"已发送扫描请求{res}")
-            if res.data:
-                return True
-        return False
-    
-    def _add_to_scan_queue(self, media_path: str):
+        缓存源文件和下载哈希对应的飞牛媒体路径
         """
-        将媒体路径添加到扫描队列（带节流）
-        :param media_path: 媒体路径
+        if src:
+            self._rename_cache.set(f"src:{src}", fn_media_path)
+        if download_hash:
+            self._rename_cache.set(f"hash:{download_hash}", fn_media_path)
+
+    def __save_rename_cache(self):
         """
-        path = Path(media_path)
-        # 先检查路径是否已在任何媒体库的扫描队列中
-        for paths in self._scan_queue.values():
-            if media_path in paths:
-                logger.debug(f"路径 {path.name} 已在扫描队列中，跳过添加")
-                # 即使路径已在队列中，也要触发扫描以确保队列被处理
-                self._throttled_scan()
-                return
-        
-        # 获取媒体库信息
-        trimemedia: TrimeMedia = self.service_info.instance
-        library = trimemedia._TrimeMedia__match_library_by_path(path)
-        if not library:
-            logger.warning(f"路径 {path.name} 对应的媒体库未找到，跳过添加")
-            self._throttled_scan()
-            return
-        
-        # 按媒体库分组管理扫描队列
-        if library.guid not in self._scan_queue:
-            self._scan_queue[library.guid] = []
-        
-        # 将路径添加到队列
-        self._scan_queue[library.guid].append(media_path)
-        logger.debug(f"路径 {path.name} 添加到扫描队列，媒体库：{library.name}")
-        
-        # 触发节流扫描
-        self._throttled_scan()
-        return
+        有修改时保存删除路径缓存
+        """
+        if self._rename_cache and self._rename_cache.dirty:
+            self.save_data(self._RENAME_CACHE_KEY, self._rename_cache.dump())
 
-    def _process_scan_queue(self):
+    def _add_to_scan_queue(self, media_path: str, lane: str = LANE_BULK):
         """
-        处理扫描队列（节流执行）
+        将媒体路径添加到扫描队列（带节流）
+        :param media_path: 媒体路径
+        :param lane: 扫描通道
         """
-        if not self._scan_queue:
-            logger.debug("扫描队列为空，跳过处理")
-            return
-        
-        logger.info("扫描队列...")
-        # 复制当前队列并清空
-        current_queue = self._scan_queue.copy()
-        self._scan_queue.clear()
-        # 按媒体库分组扫描
-        for library_guid, paths in current_queue.items():
-            if not paths:
-                continue
-            try:
-                logger.debug(f"扫描 {library_guid}，路径数量：{len(paths)}")
-                self._scan_media(library_guid, paths)
-            except Exception as e:
-                logger.error(f"扫描 {library_guid} 时发生错误：{str(e)}")
-        self._del_map.clear()
+        pipelines = list(self._pipelines.values())
+        if len(pipelines) > 1:
+            # 发送到媒体库包含该路径的服务器，都不包含时由各服务器在媒体库更新后重试
+            pipelines = [pipeline for pipeline in pipelines if pipeline.covers(media_path)] or pipelines
+        for pipeline in pipelines:
+            pipeline.enqueue(media_path, lane=lane)
 
     def get_mp_path(self, path: str) -> str:
         """
         从映射配置中获取飞牛媒体库路径，否则返回原路径
         """
         # self.map_dirs = {"/downloads/link/anime/": "/media/anime/"}
-        for mp_dir_path, fn_dir_path in self._map_dirs.items():
-            if path.startswith(mp_dir_path):
-                return path.replace(mp_dir_path, fn_dir_path)
-        return path
+        if not self._path_mapper:
+            return path
+        return self._path_mapper.translate(path) or path
     
-    def get_media_config(self) -> Optional[MediaServerConf]:
+    def get_media_configs(self) -> List[MediaServerConf]:
         """
         获取插件媒体配置
         """
         configs = self.server_helper.get_configs()
         # 只返回 type 为 trimemedia 的配置
-        for config in configs.values():
-            if config.type == "trimemedia":
-                return config
-        return None
+        return [config for config in configs.values() if config.type == "trimemedia" and config.name]
 
     def get_rename_dir(self, path: str) -> Optional[Path]:
         """
@@ -429,35 +914,133 @@ class TrimMediaTool(_PluginBase):
         """
         获取插件服务
         """
-        pass
+        if not self._enabled:
+            return []
+        services = [{
+            "id": "trimmediatool_probe",
+            "name": "飞牛连接探测",
+            "trigger": "interval",
+            "func": self._probe_service,
+            "kwargs": {"minutes": 5}
+        }, {
+            "id": "trimmediatool_metrics",
+            "name": "飞牛扫描统计",
+            "trigger": "interval",
+            "func": self._snapshot_metrics,
+            "kwargs": {"minutes": 5}
+        }]
+        if self._reconcile_cron:
+            from apscheduler.triggers.cron import CronTrigger
+            services.append({
+                "id": "trimmediatool_reconcile",
+                "name": "飞牛目录对账",
+                "trigger": CronTrigger.from_crontab(self._reconcile_cron),
+                "func": self.reconcile_library,
+                "description": "扫描映射目录中修改时间发生变化的目录"
+            })
+        return services
+
+    def reconcile_library(self):
+        """
+        目录对账
+        按修改时间索引找出映射目录中新增、删除或内容变化的目录，转换为飞牛路径后加入扫描队列，
+        未变化的子树只做 stat，不读取目录内容
+        """
+        if not self._mtime_index or not self._pipelines:
+            return
+        if not self._reconcile_lock.acquire(blocking=False):
+            logger.info("目录对账正在运行，跳过本次对账")
+            return
+        try:
+            start = time.monotonic()
+            changed = visited = listed = 0
+            for root in self._map_dirs:
+                if not os.path.isdir(root):
+                    logger.warning(f"映射目录 {root} 不存在，跳过对账")
+                    continue
+                result = reconcile(root, self._mtime_index)
+                visited += result.visited
+                listed += result.listed
+                if result.baseline:
+                    logger.info(f"映射目录 {root} 首次对账，已建立索引，共 {result.visited} 个目录")
+                    continue
+                for path in result.changed:
+                    self._add_to_scan_queue(self.get_mp_path(path))
+                changed += len(result.changed)
+            elapsed = time.monotonic() - start
+            self._metrics.incr("reconcile_changed", changed)
+            self._metrics.observe("reconcile_seconds", elapsed)
+            logger.info(f"目录对账完成，检查 {visited} 个目录，读取 {listed} 个目录，"
+                        f"{changed} 个目录加入扫描队列，耗时 {elapsed:.1f} 秒")
+        finally:
+            self._reconcile_lock.release()
+
+    def queue_depth(self) -> int:
+        """
+        待扫描路径数量，包括扫描中媒体库暂存的路径
+        """
+        return sum(pipeline.queue_depth() for pipeline in list(self._pipelines.values()))
+
+    def _snapshot_metrics(self):
+        """
+        定时采样队列长度，并将统计数据和删除路径缓存保存到插件数据
+        """
+        self.__save_rename_cache()
+        if not self._metrics:
+            return
+        self._metrics.sample_depth(self.queue_depth())
+        self.save_data(self._METRICS_KEY, self._metrics.dump())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        获取扫描流程统计
+        """
+        if not self._metrics:
+            return {}
+        pipelines = dict(self._pipelines)
+        library_names = {}
+        for pipeline in pipelines.values():
+            library_names.update(pipeline.library_names)
+        data = self._metrics.snapshot(library_names)
+        data["queue_depth"] = self.queue_depth()
+        data["inflight"] = [guid for pipeline in pipelines.values() for guid in pipeline.inflight]
+        data["servers"] = {
+            name: {
+                # 只读取缓存的连接状态，打开页面时不连接飞牛
+                "connected": self._connections[name].connected,
+                "queue_depth": pipeline.queue_depth(),
+                "lanes": pipeline.lane_depths(),
+                "inflight": pipeline.inflight,
+                "batch_size": pipeline.batch_size,
+            } for name, pipeline in pipelines.items()
+        }
+        data["watch"] = dict(self._watcher.modes) if self._watcher else {}
+        return data
 
     def stop_service(self):
         """
         停止插件服务
         """
-        pass
-
-    def _create_debounce(self, interval: float):
-        """
-        创建一个简化的防抖装饰器
-        :param interval: 防抖间隔，单位秒
-        """
-        def decorator(func):
-            timer = None
-
-            def wrapper(*args, **kwargs):
-                nonlocal timer
-                
-                # 取消之前的定时器
-                if timer:
-                    timer.cancel()
-                
-                # 设置新的定时器
-                def delayed_execution():
-                    func(*args, **kwargs)
-                
-                timer = Timer(interval, delayed_execution)
-                timer.start()
-
-            return wrapper
-        return decorator
\ No newline at end of file
+        if self._watcher:
+            self._watcher.stop()
+            self._watcher = None
+        for pipeline in self._pipelines.values():
+            pipeline.shutdown()
+        for scheduler in self._schedulers.values():
+            scheduler.shutdown()
+        for journal in self._journals.values():
+            journal.close()
+        self._pipelines = {}
+        self._schedulers = {}
+        self._journals = {}
+        self._connections = {}
+        if self._scheduler:
+            self._scheduler.shutdown()
+            self._scheduler = None
+        if self._mtime_index:
+            # 正在运行的对账不再写入索引，下次对账重新检查
+            self._mtime_index.close()
+            self._mtime_index = None
+        self.__save_rename_cache()
+        if self._metrics:
+            self.save_data(self._METRICS_KEY, self._metrics.dump())
@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+
+class TTLCache:
+    """
+    带过期时间和容量上限的缓存
+    超过容量时淘汰最久未使用的条目，可导出为列表通过插件数据持久化
+    """
+
+    def __init__(self, max_size: int = 5000, ttl: float = 30 * 24 * 3600):
+        """
+        :param max_size: 最大条目数
+        :param ttl: 过期时间，单位秒
+        """
+        self._max_size = max_size
+        self._ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 是否有未持久化的修改
+        self.dirty = False
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expire_at = item
+            if expire_at <= time.time():
+                del self._data[key]
+                self.dirty = True
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (value, time.time() + self._ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+            self.dirty = True
+
+    def dump(self) -> List[list]:
+        """
+        导出未过期的条目，按使用顺序排列
+        """
+        now = time.time()
+        with self._lock:
+            self.dirty = False
+            return [[key, value, expire_at] for key, (value, expire_at) in self._data.items() if expire_at > now]
+
+    def load(self, items: Optional[List[list]]):
+        """
+        导入 dump 导出的条目
+        """
+        now = time.time()
+        with self._lock:
+            self._data.clear()
+            for key, value, expire_at in items or []:
+                if expire_at > now:
+                    self._data[key] = (value, expire_at)
+            while len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+            self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._data)
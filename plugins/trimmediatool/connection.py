@@ -0,0 +1,114 @@
+import threading
+import time
+from typing import Any, Callable
+
+from app.log import logger
+
+
+class ServerConnection:
+    """
+    飞牛媒体服务器连接（带缓存）
+    缓存超过有效期或被探测为断开时重新获取，多个线程同时获取时只连接一次，连接失败后短时间内不再重试
+    """
+
+    # 服务信息缓存有效期（秒）
+    SERVICE_TTL = 300
+    # 连接失败后重试的最小间隔（秒）
+    SERVICE_RETRY_INTERVAL = 30
+
+    def __init__(self, name: str, get_service: Callable[[str], Any]):
+        """
+        :param name: 媒体服务器名称
+        :param get_service: 按名称获取媒体服务器服务信息
+        """
+        self.name = name
+        self._get_service = get_service
+        self._service = None
+        self._service_time = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def service(self):
+        """
+        服务信息，未连接时返回 None
+        """
+        service = self._service
+        if service is not None and time.monotonic() - self._service_time < self.SERVICE_TTL:
+            return service
+
+        with self._lock:
+            # 其他线程可能已经完成连接
+            service = self._service
+            elapsed = time.monotonic() - self._service_time
+            if service is not None and elapsed < self.SERVICE_TTL:
+                return service
+            if service is None and elapsed < self.SERVICE_RETRY_INTERVAL:
+                # 刚连接失败，暂不重试
+                return None
+            service = self.__connect()
+            self._service = service
+            self._service_time = time.monotonic()
+            return service
+
+    @property
+    def connected(self) -> bool:
+        """
+        缓存的连接状态，不会发起连接
+        """
+        return self._service is not None
+
+    def client(self):
+        """
+        飞牛影视实例，未连接时返回 None
+        """
+        service = self.service
+        return service.instance if service else None
+
+    def invalidate(self):
+        """
+        清除服务信息缓存，下次使用时重新连接
+        """
+        self._service = None
+        self._service_time = 0.0
+
+    def probe(self) -> bool:
+        """
+        探测连接，断开或未连接时重连
+        :return: 是否重新连接成功
+        """
+        service = self._service
+        if service is None:
+            # 尚未连接或上次重连失败，超过重试间隔后再次连接
+            if time.monotonic() - self._service_time < self.SERVICE_RETRY_INTERVAL:
+                return False
+            return self.service is not None
+        try:
+            inactive = service.instance.is_inactive()
+        except Exception as e:
+            logger.debug(f"探测媒体服务器 {self.name} 失败：{str(e)}")
+            inactive = True
+        if not inactive:
+            return False
+        logger.info(f"媒体服务器 {self.name} 连接已断开，重新连接")
+        self.invalidate()
+        return self.service is not None
+
+    def __connect(self):
+        """
+        获取飞牛媒体服务器，未连接时尝试重连一次
+        """
+        service = self._get_service(self.name)
+        if not service:
+            logger.warning(f"无法获取媒体服务器 {self.name}，请检查配置")
+            return None
+
+        if service.instance.is_inactive():
+            logger.info(f"媒体服务器 {self.name} 未连接，尝试重连")
+            try:
+                service.instance.reconnect()
+            except Exception as e:
+                logger.error(f"媒体服务器 {self.name} 重连失败：{str(e)}")
+            if service.instance.is_inactive():
+                logger.warning(f"媒体服务器 {self.name} 未连接，请检查配置")
+                return None
+        return service
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+
+def percentile(values: List[float], p: int) -> float:
+    """
+    计算分位数（最近秩法）
+    """
+    if not values:
+        return 0
+    values = sorted(values)
+    rank = max(1, -(-len(values) * p // 100))
+    return round(values[rank - 1], 3)
+
+
+class ScanMetrics:
+    """
+    扫描流程统计
+    计数器累计，耗时和队列长度保存在固定长度的环形缓冲中，可导出后通过插件数据持久化
+    """
+
+    def __init__(self, size: int = 500, depth_size: int = 288):
+        """
+        :param size: 每个耗时统计保留的样本数
+        :param depth_size: 队列长度保留的采样数
+        """
+        self._size = size
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._histograms: Dict[str, deque] = {}
+        # 媒体库ID -> {"requests", "failures", "latency"}
+        self._libraries: Dict[str, Dict[str, Any]] = {}
+        # [时间戳, 队列长度]
+        self._depth: deque = deque(maxlen=depth_size)
+
+    def incr(self, name: str, count: int = 1):
+        """
+        增加计数
+        """
+        if not count:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + count
+
+    def observe(self, name: str, value: float):
+        """
+        记录耗时样本
+        """
+        with self._lock:
+            self.__histogram(name).append(round(value, 3))
+
+    def observe_scan(self, library_guid: str, latency: float, success: bool):
+        """
+        记录媒体库扫描请求的耗时和结果
+        """
+        with self._lock:
+            library = self._libraries.setdefault(
+                library_guid, {"requests": 0, "failures": 0, "latency": deque(maxlen=self._size)}
+            )
+            library["requests"] += 1
+            if not success:
+                library["failures"] += 1
+            library["latency"].append(round(latency, 3))
+
+    def sample_depth(self, depth: int):
+        """
+        记录当前队列长度
+        """
+        with self._lock:
+            self._depth.append([int(time.time()), depth])
+
+    def snapshot(self, library_names: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        汇总统计数据
+        :param library_names: 媒体库ID到名称的映射
+        """
+        library_names = library_names or {}
+        with self._lock:
+            histograms = {
+                name: {
+                    "count": len(values),
+                    "p50": percentile(list(values), 50),
+                    "p95": percentile(list(values), 95),
+                    "max": max(values) if values else 0,
+                } for name, values in self._histograms.items()
+            }
+            libraries = {
+                guid: {
+                    "name": library_names.get(guid, guid),
+                    "requests": library["requests"],
+                    "failures": library["failures"],
+                    "failure_rate": round(library["failures"] / library["requests"] * 100, 1)
+                    if library["requests"] else 0,
+                    "p50": percentile(list(library["latency"]), 50),
+                    "p95": percentile(list(library["latency"]), 95),
+                } for guid, library in self._libraries.items()
+            }
+            return {
+                "counters": dict(self._counters),
+                "histograms": histograms,
+                "libraries": libraries,
+                "depth": list(self._depth),
+            }
+
+    def dump(self) -> Dict[str, Any]:
+        """
+        导出原始数据用于持久化
+        """
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {name: list(values) for name, values in self._histograms.items()},
+                "libraries": {
+                    guid: {
+                        "requests": library["requests"],
+                        "failures": library["failures"],
+                        "latency": list(library["latency"]),
+                    } for guid, library in self._libraries.items()
+                },
+                "depth": list(self._depth),
+            }
+
+    def load(self, data: Optional[Dict[str, Any]]):
+        """
+        导入 dump 导出的数据
+        """
+        if not data:
+            return
+        with self._lock:
+            self._counters = dict(data.get("counters") or {})
+            self._histograms = {}
+            for name, values in (data.get("histograms") or {}).items():
+                self.__histogram(name).extend(values)
+            self._libraries = {
+                guid: {
+                    "requests": library.get("requests", 0),
+                    "failures": library.get("failures", 0),
+                    "latency": deque(library.get("latency") or [], maxlen=self._size),
+                } for guid, library in (data.get("libraries") or {}).items()
+            }
+            self._depth.clear()
+            self._depth.extend(data.get("depth") or [])
+
+    def __histogram(self, name: str) -> deque:
+        if name not in self._histograms:
+            self._histograms[name] = deque(maxlen=self._size)
+        return self._histograms[name]
@@ -0,0 +1,146 @@
+from pathlib import PurePosixPath
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def split_path(path: str) -> Tuple[str, ...]:
+    """
+    按目录层级拆分路径，忽略多余的分隔符和末尾的 /
+    """
+    return PurePosixPath(path).parts
+
+
+class _Node:
+    __slots__ = ("children", "value")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # 该节点对应的值，PathTrie 中为已添加的路径
+        self.value: Optional[Any] = None
+
+
+class PathTrie:
+    """
+    路径前缀树
+    只保留能覆盖所有已添加路径的最小目录集合：已添加目录的子路径会被忽略，
+    添加上级目录时会移除其下已添加的子路径
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._size = 0
+        # 因重复或被上级目录覆盖而合并的路径数量
+        self.merged = 0
+
+    def add(self, path: str) -> bool:
+        """
+        添加路径
+        :return: 是否新增，路径重复或已被上级目录覆盖时返回 False
+        """
+        node = self._root
+        for part in split_path(path):
+            if node.value is not None:
+                self.merged += 1
+                return False
+            node = node.children.setdefault(part, _Node())
+        if node.value is not None:
+            self.merged += 1
+            return False
+        # 上级目录覆盖其下所有已添加的子路径
+        covered = self.__count(node)
+        self.merged += covered
+        self._size -= covered
+        node.children.clear()
+        node.value = path
+        self._size += 1
+        return True
+
+    def paths(self) -> List[str]:
+        """
+        获取覆盖所有已添加路径的最小目录集合
+        """
+        result = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node.value is not None:
+                result.append(node.value)
+                continue
+            stack.extend(node.children.values())
+        return sorted(result)
+
+    @staticmethod
+    def __count(node: _Node) -> int:
+        count = 0
+        stack = list(node.children.values())
+        while stack:
+            child = stack.pop()
+            if child.value is not None:
+                count += 1
+            stack.extend(child.children.values())
+        return count
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+
+class PrefixIndex:
+    """
+    目录前缀索引
+    按目录层级匹配最长的前缀，/media/tv 不会匹配 /media/tv2，查找耗时只与路径深度有关
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, Any]] = ()):
+        """
+        :param items: 目录前缀和对应的值
+        """
+        self._root = _Node()
+        for prefix, value in items:
+            self.insert(prefix, value)
+
+    def insert(self, prefix: str, value: Any):
+        node = self._root
+        for part in split_path(prefix):
+            node = node.children.setdefault(part, _Node())
+        node.value = value
+
+    def longest_match(self, path: str) -> Tuple[Optional[Any], Tuple[str, ...]]:
+        """
+        查找最长匹配的前缀
+        :return: 匹配的值和前缀之后剩余的目录层级，没有匹配时值为 None
+        """
+        parts = split_path(path)
+        node = self._root
+        value, depth = None, 0
+        for index, part in enumerate(parts):
+            node = node.children.get(part)
+            if node is None:
+                break
+            if node.value is not None:
+                value, depth = node.value, index + 1
+        return value, parts[depth:]
+
+
+class PathMapper(PrefixIndex):
+    """
+    目录映射索引
+    只替换路径开头匹配的部分
+    """
+
+    def __init__(self, mappings: Dict[str, str]):
+        """
+        :param mappings: 源目录到目标目录的映射
+        """
+        super().__init__(mappings.items())
+
+    def translate(self, path: str) -> Optional[str]:
+        """
+        转换路径
+        :return: 转换后的路径，没有匹配的映射时返回 None
+        """
+        target, rest = self.longest_match(path)
+        if target is None:
+            return None
+        return str(PurePosixPath(target, *rest))
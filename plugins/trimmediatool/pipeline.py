@@ -0,0 +1,588 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.log import logger
+
+from .metrics import ScanMetrics
+from .pathindex import PathTrie, PrefixIndex
+from .scanqueue import UNMATCHED_LIBRARY, AdaptiveBatcher, ScanJournal, ScanQueue
+from .scheduler import DebounceScheduler
+
+
+# 快速通道：最近播出的剧集和需要立即观看的入库
+LANE_FAST = "fast"
+# 批量通道：批量整理、删除源文件、目录对账和监控
+LANE_BULK = "bulk"
+
+
+class ScanLane:
+    """
+    扫描通道
+    每个通道有独立的队列、防抖策略和调度线程
+    """
+
+    def __init__(self, name: str, scheduler: DebounceScheduler, delay_seconds: float, max_wait_seconds: float,
+                 journal: Optional[ScanJournal] = None):
+        self.name = name
+        self.scheduler = scheduler
+        self.delay_seconds = delay_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.queue = ScanQueue(journal=journal)
+        # 本轮防抖第一次触发的时间
+        self.wait_start: Optional[float] = None
+
+
+class ScanPipeline:
+    """
+    飞牛扫描流程
+    路径按通道和媒体库入队，各通道在各自的调度线程中防抖后合并发送扫描请求；
+    批量通道的媒体库正在扫描时暂存路径，扫描结束后合并发送，快速通道不等待
+    飞牛客户端通过 get_client 获取，只需提供 api.request、api.task_running、api.mdb_list，
+    可以替换为模拟服务进行离线测试
+    """
+
+    # 并发扫描的媒体库数量上限
+    MAX_SCAN_WORKERS = 4
+    # 媒体库索引有效期（秒）
+    LIBRARY_INDEX_TTL = 1800
+    # 路径未匹配时刷新媒体库索引的最小间隔（秒）
+    LIBRARY_REFRESH_INTERVAL = 60
+    # 未匹配媒体库的路径保留上限
+    UNMATCHED_LIMIT = 1000
+    # 单批扫描请求失败后的重试次数
+    SCAN_RETRIES = 2
+    # 重试退避基础时间（秒）
+    SCAN_RETRY_BACKOFF = 1
+    # 扫描任务轮询间隔（秒）
+    SCAN_POLL_SECONDS = 10
+    # 发送扫描后至少等待的时间（秒），期间任务可能尚未出现在飞牛任务列表
+    SCAN_GRACE_SECONDS = 5
+    # 未连接时重新处理队列的间隔（秒）
+    RECONNECT_RETRY_SECONDS = 30
+    # 单次扫描最长视为进行中的时间（秒）
+    SCAN_MAX_SECONDS = 1800
+    # 飞牛运行中任务的类型字段，包含 scan 的是媒体库扫描任务
+    TASK_TYPE_FIELDS = ("type", "task_type")
+    # 飞牛运行中任务中所属媒体库的字段，任务自身的 guid 不是媒体库ID
+    TASK_LIBRARY_FIELDS = ("mdb_guid",)
+
+    def __init__(self, get_client: Callable[[], Any], scheduler: DebounceScheduler,
+                 metrics: Optional[ScanMetrics] = None, journal: Optional[ScanJournal] = None,
+                 delay_seconds: float = 10, max_wait_seconds: float = 60,
+                 fast_delay_seconds: float = 2, fast_max_wait_seconds: float = 10,
+                 on_error: Optional[Callable[[], None]] = None, name: str = "scan",
+                 fast_scheduler: Optional[DebounceScheduler] = None):
+        """
+        :param get_client: 获取飞牛客户端，未连接时返回 None
+        :param scheduler: 防抖调度器
+        :param metrics: 扫描流程统计
+        :param journal: 扫描队列持久化日志
+        :param delay_seconds: 批量通道防抖间隔，单位秒
+        :param max_wait_seconds: 批量通道最长等待时间，单位秒
+        :param fast_delay_seconds: 快速通道防抖间隔，单位秒
+        :param fast_max_wait_seconds: 快速通道最长等待时间，单位秒
+        :param on_error: 扫描请求异常时调用，用于清除连接缓存
+        :param name: 名称，用于区分调度任务和线程
+        :param fast_scheduler: 快速通道的调度器，为空时创建独立的调度线程，避免被批量扫描阻塞
+        """
+        self._get_client = get_client
+        self._scheduler = scheduler
+        self._metrics = metrics or ScanMetrics()
+        self._on_error = on_error
+        self._name = name
+        self._journal = journal
+        self._own_fast_scheduler = fast_scheduler is None
+        if fast_scheduler is None:
+            fast_scheduler = DebounceScheduler(name=f"TrimMediaTool-{name}-fast")
+        # 日志由所有通道共用，只由批量通道恢复
+        self._lanes: Dict[str, ScanLane] = {
+            LANE_FAST: ScanLane(LANE_FAST, fast_scheduler, fast_delay_seconds, fast_max_wait_seconds,
+                                journal=journal),
+            LANE_BULK: ScanLane(LANE_BULK, scheduler, delay_seconds, max_wait_seconds, journal=journal),
+        }
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_SCAN_WORKERS,
+                                            thread_name_prefix=f"TrimMediaTool-{name}")
+        self._batcher = AdaptiveBatcher()
+        # 媒体库目录索引
+        self._library_index: Optional[PrefixIndex] = None
+        self._library_index_time = 0.0
+        # 只保护索引状态，请求飞牛时不持有，避免慢速服务器阻塞事件线程
+        self._library_lock = threading.Lock()
+        # 是否正在请求媒体库列表，同时只请求一次
+        self._library_refreshing = False
+        # 媒体库ID到名称的映射
+        self.library_names: Dict[str, str] = {}
+        # 未匹配媒体库的 (路径, 通道) -> 日志记录ID，索引更新后重试
+        self._unmatched: Dict[Tuple[str, str], Optional[int]] = {}
+        self._unmatched_lock = threading.Lock()
+        # 扫描中的媒体库及开始时间
+        self._inflight: Dict[str, float] = {}
+        # 扫描中的媒体库暂存的路径
+        self._held_paths: Dict[str, PathTrie] = {}
+        # 已记录过的无法解析的任务字段，每种只记录一次日志
+        self._unparsed_tasks: set = set()
+
+    @property
+    def batch_size(self) -> int:
+        return self._batcher.size
+
+    @property
+    def inflight(self) -> List[str]:
+        return list(self._inflight.keys())
+
+    def queue_depth(self) -> int:
+        """
+        待扫描路径数量，包括扫描中媒体库暂存的路径
+        """
+        depth = sum(len(lane.queue) for lane in self._lanes.values())
+        return depth + sum(len(held) for held in list(self._held_paths.values()))
+
+    def lane_depths(self) -> Dict[str, int]:
+        """
+        各通道待扫描路径数量
+        """
+        return {name: len(lane.queue) for name, lane in self._lanes.items()}
+
+    def idle(self) -> bool:
+        """
+        是否没有待处理的路径、扫描中的媒体库和待执行的调度任务
+        """
+        return (not any(lane.queue for lane in self._lanes.values())
+                and not self._held_paths and not self._inflight
+                and not any(lane.scheduler.active(self.__lane_key(name)) for name, lane in self._lanes.items())
+                and not self._scheduler.active(f"{self._name}:poll")
+                and not self._scheduler.active(f"{self._name}:library"))
+
+    def replay(self) -> int:
+        """
+        恢复持久化日志中未扫描的路径，放入批量通道；未匹配媒体库的路径在媒体库索引更新后重试
+        """
+        restored = self._lanes[LANE_BULK].queue.replay()
+        if restored:
+            logger.info(f"恢复 {restored} 个未扫描的路径")
+            self.trigger()
+        unmatched = self._journal.load_unmatched() if self._journal else []
+        for media_path, entry_id in unmatched:
+            self.__add_unmatched(media_path, LANE_BULK, entry_id)
+        if unmatched:
+            logger.info(f"恢复 {len(unmatched)} 个未匹配媒体库的路径，媒体库索引更新后重试")
+            self.refresh_library_index_async()
+        return restored + len(unmatched)
+
+    def shutdown(self):
+        """
+        停止扫描线程池，未完成的请求不再等待
+        """
+        for name, lane in self._lanes.items():
+            lane.scheduler.cancel(self.__lane_key(name))
+        self._scheduler.cancel(f"{self._name}:poll")
+        self._scheduler.cancel(f"{self._name}:library")
+        if self._own_fast_scheduler:
+            self._lanes[LANE_FAST].scheduler.shutdown()
+        self._executor.shutdown(wait=False)
+
+    def enqueue(self, media_path: str, lane: str = LANE_BULK) -> bool:
+        """
+        将媒体路径添加到扫描队列（带节流）
+        :param media_path: 飞牛媒体路径
+        :param lane: 扫描通道
+        :return: 是否找到所属媒体库
+        """
+        path = Path(media_path)
+        lane = lane if lane in self._lanes else LANE_BULK
+        # 只使用已加载的媒体库索引，不在事件线程中连接飞牛，路径保存在队列中等待重连
+        library = self.match_library(media_path)
+        if not library:
+            if self.__add_unmatched(media_path, lane):
+                logger.warning(f"路径 {path.name} 对应的媒体库未找到，媒体库更新后重试")
+            self._metrics.incr("unmatched")
+            self.refresh_library_index_async(on_miss=True)
+            return False
+
+        # 将路径添加到队列，取出时按媒体库合并重复路径和子路径
+        self._lanes[lane].queue.put(library.guid, media_path)
+        self._metrics.incr("enqueued")
+        self._metrics.incr(f"enqueued_{lane}")
+        logger.debug(f"路径 {path.name} 添加到{lane}扫描队列，媒体库：{library.name}")
+
+        # 触发节流扫描
+        self.trigger(lane)
+        return True
+
+    def trigger(self, lane: str = LANE_BULK):
+        """
+        触发通道的防抖扫描，delay_seconds 内没有新路径或等待超过 max_wait_seconds 时处理该通道的队列
+        """
+        scan_lane = self._lanes[lane]
+        key = self.__lane_key(lane)
+        if not scan_lane.scheduler.pending(key):
+            scan_lane.wait_start = time.monotonic()
+        scan_lane.scheduler.debounce(key, lambda: self.process(lane),
+                                     delay=scan_lane.delay_seconds, max_wait=scan_lane.max_wait_seconds)
+
+    def resume(self):
+        """
+        重新连接后立即处理所有通道积压的路径，媒体库索引未加载或有未匹配的路径时刷新索引
+        """
+        for name, scan_lane in self._lanes.items():
+            if scan_lane.queue:
+                self.trigger(name)
+        if self._library_index is None or self._unmatched:
+            self.refresh_library_index_async(on_miss=self._library_index is not None)
+        self.__schedule_poll()
+
+    def __add_unmatched(self, media_path: str, lane: str, entry_id: Optional[int] = None) -> bool:
+        """
+        保存未匹配媒体库的路径，同时写入日志，重启或重连后在媒体库索引更新时重试
+        :param entry_id: 已有的日志记录ID，为空时新增记录
+        :return: 是否保存
+        """
+        key = (media_path, lane)
+        with self._unmatched_lock:
+            saved = key not in self._unmatched and len(self._unmatched) < self.UNMATCHED_LIMIT
+            if saved:
+                self._unmatched[key] = entry_id
+        if not saved:
+            if key not in self._unmatched:
+                logger.warning(f"路径 {Path(media_path).name} 对应的媒体库未找到，待重试路径过多，跳过添加")
+                self._metrics.incr("dropped")
+            if entry_id is not None:
+                self._journal.delete([entry_id])
+            return False
+        if entry_id is None and self._journal:
+            entry_id = self._journal.add(UNMATCHED_LIBRARY, media_path)
+            with self._unmatched_lock:
+                if key in self._unmatched:
+                    self._unmatched[key] = entry_id
+                    entry_id = None
+            if entry_id is not None:
+                # 写入日志期间已被重试
+                self._journal.delete([entry_id])
+        return True
+
+    def __lane_key(self, lane: str) -> str:
+        return f"{self._name}:scan:{lane}"
+
+    def covers(self, media_path: str) -> bool:
+        """
+        路径是否属于该服务器的媒体库
+        """
+        return self.match_library(media_path) is not None
+
+    def match_library(self, media_path: str):
+        """
+        根据已加载的媒体库索引查找路径所属媒体库，不请求飞牛，索引未加载或过期时在后台刷新
+        :return: 媒体库，未找到时返回 None
+        """
+        index = self._library_index
+        if index is None or time.monotonic() - self._library_index_time > self.LIBRARY_INDEX_TTL:
+            self.refresh_library_index_async()
+        return index.longest_match(media_path)[0] if index else None
+
+    def refresh_library_index_async(self, on_miss: bool = False):
+        """
+        在调度线程中刷新媒体库索引，连接飞牛和请求媒体库列表不阻塞事件线程
+        :param on_miss: 是否因路径未匹配而刷新
+        """
+        self._scheduler.debounce(f"{self._name}:library", lambda: self.__refresh_library_index(on_miss), delay=0)
+
+    def __refresh_library_index(self, on_miss: bool):
+        client = self._get_client()
+        if client:
+            self.refresh_library_index(client, on_miss=on_miss)
+
+    def refresh_library_index(self, client: Any, on_miss: bool = False) -> bool:
+        """
+        从飞牛加载媒体库目录，构建目录到媒体库的索引
+        请求期间不持有锁，其他线程同时刷新时直接返回，由正在请求的线程重试未匹配的路径
+        :param on_miss: 是否因路径未匹配而刷新，此时限制刷新频率
+        :return: 是否刷新了索引
+        """
+        with self._library_lock:
+            elapsed = time.monotonic() - self._library_index_time
+            fresh = True
+            if self._library_index is not None:
+                if on_miss and elapsed < self.LIBRARY_REFRESH_INTERVAL:
+                    return False
+                if not on_miss and elapsed <= self.LIBRARY_INDEX_TTL:
+                    # 其他线程已经刷新，按现有索引重试未匹配的路径
+                    fresh = False
+            if fresh:
+                if self._library_refreshing:
+                    return False
+                self._library_refreshing = True
+        if fresh:
+            try:
+                libraries = client.api.mdb_list() or []
+            except Exception as e:
+                logger.error(f"获取飞牛媒体库列表失败：{str(e)}")
+                libraries = None
+            index = PrefixIndex(
+                (library_dir, library) for library in libraries or [] for library_dir in library.dir_list or []
+            )
+            with self._library_lock:
+                self._library_refreshing = False
+                if libraries is None:
+                    return False
+                self._library_index = index
+                self._library_index_time = time.monotonic()
+                self.library_names = {library.guid: library.name for library in libraries}
+            logger.debug(f"媒体库索引已更新，共 {len(libraries)} 个媒体库")
+        self.__retry_unmatched(fresh)
+        return True
+
+    def __retry_unmatched(self, fresh: bool):
+        """
+        按媒体库索引重试之前未匹配的路径，匹配到的路径加入原通道后删除未匹配记录
+        :param fresh: 索引是否刚从飞牛加载，此时仍未匹配的路径不再保留日志记录，避免日志无限增长
+        """
+        index = self._library_index
+        with self._unmatched_lock:
+            unmatched, self._unmatched = self._unmatched, {}
+        if not unmatched or index is None:
+            with self._unmatched_lock:
+                self._unmatched.update(unmatched)
+            return
+        retried = 0
+        lanes = set()
+        resolved: List[int] = []
+        kept: Dict[Tuple[str, str], Optional[int]] = {}
+        for (media_path, lane), entry_id in unmatched.items():
+            library = index.longest_match(media_path)[0]
+            if library is None:
+                if fresh and entry_id is not None:
+                    resolved.append(entry_id)
+                    entry_id = None
+                kept[(media_path, lane)] = entry_id
+                continue
+            # 先写入新记录再删除未匹配记录，中途重启也不会丢失
+            self._lanes[lane].queue.put(library.guid, media_path)
+            if entry_id is not None:
+                resolved.append(entry_id)
+            retried += 1
+            lanes.add(lane)
+        with self._unmatched_lock:
+            for key, entry_id in kept.items():
+                self._unmatched.setdefault(key, entry_id)
+        if resolved:
+            self._journal.delete(resolved)
+        if retried:
+            logger.info(f"{retried} 个之前未匹配媒体库的路径已加入扫描队列")
+            for lane in lanes:
+                self.trigger(lane)
+
+    def process(self, lane: str = LANE_BULK):
+        """
+        处理通道的扫描队列（节流执行）
+        批量通道中正在扫描的媒体库先暂存路径，等扫描结束后合并为一次请求；
+        快速通道直接发送，不排在批量扫描之后
+        """
+        scan_lane = self._lanes[lane]
+        if not scan_lane.queue:
+            logger.debug(f"{lane}扫描队列为空，跳过处理")
+            return
+
+        client = self._get_client()
+        if not client:
+            # 路径保留在队列中，稍后重试，不依赖新的入库事件
+            logger.debug(f"飞牛未连接，{self.RECONNECT_RETRY_SECONDS} 秒后重新处理{lane}队列")
+            scan_lane.scheduler.debounce(self.__lane_key(lane), lambda: self.process(lane),
+                                         delay=self.RECONNECT_RETRY_SECONDS, max_wait=self.RECONNECT_RETRY_SECONDS)
+            return
+
+        logger.info(f"扫描{lane}队列...")
+        self._metrics.sample_depth(self.queue_depth())
+        if scan_lane.wait_start is not None:
+            wait = time.monotonic() - scan_lane.wait_start
+            self._metrics.observe("debounce_wait", wait)
+            self._metrics.observe(f"debounce_wait_{lane}", wait)
+            scan_lane.wait_start = None
+        # 取出当前队列，期间新加入的路径留到下一次处理
+        current_queue = scan_lane.queue.drain()
+        self._metrics.incr("deduplicated", sum(paths.merged for paths in current_queue.values()))
+        # 飞牛正在扫描的媒体库
+        self.__update_inflight(self.running_libraries(client))
+        batches = {}
+        for library_guid, paths in current_queue.items():
+            if not paths:
+                continue
+            if lane == LANE_BULK and library_guid in self._inflight:
+                # 合并到暂存路径，扫描结束后一起发送
+                held = self._held_paths.setdefault(library_guid, PathTrie())
+                for media_path in paths.paths():
+                    held.add(media_path)
+                self._metrics.incr("held", len(paths))
+                logger.info(f"媒体库 {library_guid} 正在扫描，暂存 {len(held)} 个路径")
+                continue
+            batches[library_guid] = paths.paths()
+        self.dispatch(client, batches, lane=lane)
+        self.__schedule_poll()
+
+    def poll(self):
+        """
+        轮询飞牛扫描任务，媒体库空闲后发送暂存的路径
+        所有媒体库共用一次 task_running 查询
+        """
+        if not self._inflight:
+            return
+        client = self._get_client()
+        if not client:
+            self.__schedule_poll()
+            return
+        running = self.running_libraries(client)
+        now = time.monotonic()
+        batches = {}
+        for library_guid, started in list(self._inflight.items()):
+            elapsed = now - started
+            if library_guid in running and elapsed < self.SCAN_MAX_SECONDS:
+                continue
+            if library_guid not in running and elapsed < self.SCAN_GRACE_SECONDS:
+                # 刚发送的扫描可能还没出现在任务列表中
+                continue
+            self._inflight.pop(library_guid, None)
+            held = self._held_paths.pop(library_guid, None)
+            if held:
+                logger.info(f"媒体库 {library_guid} 扫描结束，发送暂存的 {len(held)} 个路径")
+                batches[library_guid] = held.paths()
+        self.dispatch(client, batches)
+        self.__schedule_poll()
+
+    def dispatch(self, client: Any, batches: Dict[str, List[str]], lane: str = LANE_BULK):
+        """
+        并发发送不同媒体库的扫描请求，成功后记录为扫描中
+        :param batches: 媒体库ID到路径列表的映射
+        :param lane: 发送失败时重新加入的通道
+        """
+        if lane == LANE_FAST:
+            # 快速通道路径很少，在本通道线程中直接发送，不等待被批量扫描占用的线程池
+            for library_guid, media_paths in batches.items():
+                try:
+                    if self.scan_library(client, library_guid, media_paths, lane):
+                        self._inflight[library_guid] = time.monotonic()
+                except Exception as e:
+                    logger.error(f"扫描 {library_guid} 时发生错误：{str(e)}")
+            return
+        futures = {}
+        for library_guid, media_paths in batches.items():
+            logger.debug(f"扫描 {library_guid}，路径数量：{len(media_paths)}")
+            future = self._executor.submit(self.scan_library, client, library_guid, media_paths, lane)
+            futures[future] = library_guid
+        for future in as_completed(futures):
+            library_guid = futures[future]
+            try:
+                if future.result():
+                    self._inflight[library_guid] = time.monotonic()
+            except Exception as e:
+                logger.error(f"扫描 {library_guid} 时发生错误：{str(e)}")
+
+    def scan_library(self, client: Any, library_guid: str, media_paths: List[str],
+                     lane: str = LANE_BULK) -> bool:
+        """
+        分批扫描媒体库，批次大小根据飞牛响应耗时自动调整
+        失败的批次重试后仍失败时重新加入原通道的扫描队列
+        :return: 是否有批次发送成功
+        """
+        queue = self._lanes[lane].queue
+        sent = False
+        failed: List[str] = []
+        for chunk in self._batcher.split(media_paths):
+            if self.__scan_chunk(client, library_guid, chunk):
+                sent = True
+                queue.done(library_guid, chunk)
+            else:
+                failed.extend(chunk)
+        if failed:
+            logger.warning(f"扫描 {library_guid} 有 {len(failed)} 个路径发送失败，重新加入扫描队列")
+            for media_path in failed:
+                queue.put(library_guid, media_path)
+            # 已重新入队并写入新记录，移除原记录
+            queue.done(library_guid, failed)
+            self.trigger(lane)
+        return sent
+
+    def __scan_chunk(self, client: Any, library_guid: str, chunk: List[str]) -> bool:
+        """
+        发送一批扫描请求，失败时退避重试
+        """
+        for attempt in range(self.SCAN_RETRIES + 1):
+            if attempt:
+                time.sleep(self.SCAN_RETRY_BACKOFF * 2 ** (attempt - 1))
+            start = time.monotonic()
+            try:
+                success = self.scan_media(client, library_guid, chunk)
+            except Exception as e:
+                logger.error(f"扫描 {library_guid} 时发生错误：{str(e)}")
+                success = False
+                # 连接可能已失效，下次使用时重新连接
+                if self._on_error:
+                    self._on_error()
+            latency = time.monotonic() - start
+            self._batcher.record(latency, success)
+            self._metrics.observe_scan(library_guid, latency, success)
+            self._metrics.observe("scan_paths", len(chunk))
+            if success:
+                return True
+            logger.debug(f"扫描 {library_guid} 第 {attempt + 1} 次请求失败，路径数量：{len(chunk)}")
+        return False
+
+    @staticmethod
+    def scan_media(client: Any, library_guid: str, media_paths: List[str]) -> bool:
+        """
+        扫描媒体文件
+        :param client: 飞牛客户端
+        :param library_guid: 媒体库ID
+        :param media_paths: 媒体路径
+        :return: 是否成功
+        """
+        data = {"dir_list": media_paths}
+        if (res := client.api.request(f"/mdb/scan/{library_guid}", method="post", data=data)) and res.success:
+            logger.debug(f"已发送扫描请求{res}")
+            if res.data:
+                return True
+        return False
+
+    def running_libraries(self, client: Any) -> set:
+        """
+        获取飞牛正在执行扫描任务的媒体库ID
+        只统计扫描任务，无法解析出媒体库的任务记录日志
+        """
+        try:
+            tasks = client.api.task_running() or []
+        except Exception as e:
+            logger.debug(f"获取飞牛运行中任务失败：{str(e)}")
+            return set()
+        running = set()
+        for task in tasks:
+            if not isinstance(task, dict):
+                task = getattr(task, "__dict__", {})
+            task_type = next((str(task[field]) for field in self.TASK_TYPE_FIELDS if task.get(field)), None)
+            if task_type is not None and "scan" not in task_type.lower():
+                continue
+            library_guid = next((task[field] for field in self.TASK_LIBRARY_FIELDS if task.get(field)), None)
+            if library_guid:
+                running.add(library_guid)
+                continue
+            fields = tuple(sorted(task))
+            if fields not in self._unparsed_tasks:
+                self._unparsed_tasks.add(fields)
+                logger.warning(f"无法从飞牛运行中任务解析媒体库，扫描中状态可能不准确：{task}")
+        return running
+
+    def __update_inflight(self, running: set):
+        """
+        将飞牛报告正在扫描的媒体库记录为扫描中
+        """
+        now = time.monotonic()
+        for library_guid in running:
+            self._inflight.setdefault(library_guid, now)
+
+    def __schedule_poll(self):
+        """
+        有扫描中的媒体库时，按固定间隔轮询任务状态
+        """
+        if self._inflight:
+            self._scheduler.debounce(f"{self._name}:poll", self.poll,
+                                     delay=self.SCAN_POLL_SECONDS, max_wait=self.SCAN_POLL_SECONDS)
@@ -0,0 +1,132 @@
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class MtimeIndex:
+    """
+    目录修改时间索引
+    保存每个目录的修改时间和子目录列表，使用 SQLite 持久化，只写入有变化的目录
+    """
+
+    def __init__(self, db_path: Path):
+        self._lock = threading.Lock()
+        self._closed = False
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            "path TEXT PRIMARY KEY, mtime INTEGER NOT NULL, children TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def load(self, root: str) -> Dict[str, Tuple[int, List[str]]]:
+        """
+        加载根目录及其下所有目录的记录
+        :return: 目录 -> (修改时间纳秒, 子目录名称列表)
+        """
+        prefix = root.rstrip("/") + "/"
+        with self._lock:
+            if self._closed:
+                return {}
+            rows = self._conn.execute(
+                "SELECT path, mtime, children FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+                (root, len(prefix), prefix)
+            )
+            return {path: (mtime, json.loads(children)) for path, mtime, children in rows}
+
+    def update(self, changed: Dict[str, Tuple[int, List[str]]], removed: Iterable[str]):
+        """
+        写入有变化的目录，删除已不存在的目录
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)",
+                [(path, mtime, json.dumps(children, ensure_ascii=False))
+                 for path, (mtime, children) in changed.items()]
+            )
+            self._conn.executemany("DELETE FROM dirs WHERE path = ?", [(path,) for path in removed])
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+
+
+class ReconcileResult:
+    """
+    一次对账的结果
+    """
+
+    def __init__(self):
+        # 需要扫描的目录
+        self.changed: List[str] = []
+        # 已不存在的目录
+        self.removed: List[str] = []
+        # 检查的目录数
+        self.visited = 0
+        # 读取了目录内容的目录数
+        self.listed = 0
+        # 是否首次建立索引
+        self.baseline = False
+
+
+def reconcile(root: str, index: MtimeIndex, skip: Optional[Callable[[str], bool]] = None) -> ReconcileResult:
+    """
+    对比目录修改时间，找出根目录下有变化的目录
+    目录的修改时间只在其直接子项增删或重命名时变化，因此修改时间未变的目录直接使用索引中的子目录列表，
+    只对子目录执行 stat，不读取目录内容；首次运行时只建立索引，不报告变化。
+    子目录有增删时只报告增删的子目录，否则报告目录本身，根目录本身不报告，避免扫描整个媒体库
+    :param root: 根目录
+    :param index: 修改时间索引
+    :param skip: 判断是否跳过某个目录
+    """
+    result = ReconcileResult()
+    known = index.load(root)
+    result.baseline = not known
+    updates: Dict[str, Tuple[int, List[str]]] = {}
+    seen = set()
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        seen.add(path)
+        result.visited += 1
+        record = known.get(path)
+        if record and record[0] == mtime:
+            children = record[1]
+        else:
+            try:
+                with os.scandir(path) as entries:
+                    children = sorted(entry.name for entry in entries
+                                      if entry.is_dir(follow_symlinks=False) and not entry.name.startswith("."))
+            except OSError:
+                continue
+            result.listed += 1
+            updates[path] = (mtime, children)
+            # 新目录一定在有变化的上级目录中，只处理已有目录
+            if record is not None:
+                added = set(children) - set(record[1])
+                removed = set(record[1]) - set(children)
+                if added or removed:
+                    result.changed.extend(os.path.join(path, name) for name in sorted(added | removed))
+                elif path != root:
+                    result.changed.append(path)
+        for name in children:
+            child = os.path.join(path, name)
+            if skip and skip(child):
+                continue
+            stack.append(child)
+    result.removed = [path for path in known if path not in seen]
+    index.update(updates, result.removed)
+    return result
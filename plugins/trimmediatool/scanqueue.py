@@ -0,0 +1,246 @@
+import sqlite3
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .pathindex import PathTrie
+
+# 日志中未匹配媒体库的路径使用的媒体库ID
+UNMATCHED_LIBRARY = ""
+
+
+class ScanQueue:
+    """
+    待扫描路径队列
+    事件线程只做 deque.append，处理线程逐个 popleft 取出并按媒体库分组，
+    两者都是原子操作，不需要加锁；取出过程中新到达的路径留到下一次处理，不会丢失也不会重复
+    """
+
+    def __init__(self, journal: Optional["ScanJournal"] = None):
+        """
+        :param journal: 持久化日志，路径在扫描成功前都保存在日志中
+        """
+        # (媒体库ID, 路径, 日志记录ID)
+        self._pending: deque = deque()
+        self._journal = journal
+
+    def put(self, library_guid: str, media_path: str):
+        """
+        添加待扫描路径
+        :param library_guid: 媒体库ID
+        :param media_path: 飞牛媒体路径
+        """
+        entry_id = self._journal.add(library_guid, media_path) if self._journal else None
+        self._pending.append((library_guid, media_path, entry_id))
+
+    def done(self, library_guid: str, media_paths: List[str]):
+        """
+        路径扫描成功，从日志中移除已取出的记录，仍在队列中的记录保留
+        """
+        if self._journal:
+            self._journal.remove(library_guid, media_paths)
+
+    def replay(self) -> int:
+        """
+        将日志中未扫描的路径重新加入队列
+        :return: 恢复的路径数量
+        """
+        if not self._journal:
+            return 0
+        entries = self._journal.load()
+        self._pending.extend(entries)
+        return len(entries)
+
+    def drain(self) -> Dict[str, PathTrie]:
+        """
+        取出当前所有待扫描路径，按媒体库分组，合并重复路径和已被上级目录覆盖的路径
+        只取调用时已在队列中的条目，持续写入时也能及时返回
+        """
+        batch: Dict[str, PathTrie] = {}
+        drained = []
+        for _ in range(len(self._pending)):
+            try:
+                library_guid, media_path, entry_id = self._pending.popleft()
+            except IndexError:
+                break
+            batch.setdefault(library_guid, PathTrie()).add(media_path)
+            if entry_id is not None:
+                drained.append((library_guid, media_path, entry_id))
+        if drained:
+            self._journal.take(drained)
+        return batch
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __bool__(self) -> bool:
+        return bool(self._pending)
+
+
+class ScanJournal:
+    """
+    扫描队列持久化日志
+    使用 SQLite WAL 模式，每次入队追加一行，插件重载或重启后可恢复；
+    出队的记录在扫描成功后才删除，扫描期间同一路径再次入队时新记录不受影响；
+    媒体库索引加载前收到的路径以空媒体库ID保存，匹配到媒体库后删除
+    """
+
+    def __init__(self, db_path: Path):
+        self._lock = threading.Lock()
+        self._closed = False
+        # 媒体库ID -> 已出队、等待扫描结果的 (路径, 记录ID)
+        self._taken: Dict[str, List[Tuple[str, int]]] = {}
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, library_guid TEXT NOT NULL, path TEXT NOT NULL)"
+        )
+        # 旧版本每个路径只保存一行，迁移到新表
+        if self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pending'").fetchone():
+            self._conn.execute("INSERT INTO entries (library_guid, path) SELECT library_guid, path FROM pending")
+            self._conn.execute("DROP TABLE pending")
+        self._conn.commit()
+
+    def add(self, library_guid: str, media_path: str) -> Optional[int]:
+        """
+        追加一条记录
+        :return: 记录ID
+        """
+        with self._lock:
+            if self._closed:
+                return None
+            cursor = self._conn.execute("INSERT INTO entries (library_guid, path) VALUES (?, ?)",
+                                        (library_guid, media_path))
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def delete(self, entry_ids: List[int]):
+        """
+        按记录ID删除
+        """
+        with self._lock:
+            if self._closed or not entry_ids:
+                return
+            self._conn.executemany("DELETE FROM entries WHERE id = ?", [(entry_id,) for entry_id in entry_ids])
+            self._conn.commit()
+
+    def take(self, entries: List[Tuple[str, str, int]]):
+        """
+        记录已出队的条目，扫描成功后由 remove 删除
+        :param entries: (媒体库ID, 路径, 记录ID)
+        """
+        with self._lock:
+            for library_guid, media_path, entry_id in entries:
+                self._taken.setdefault(library_guid, []).append((media_path, entry_id))
+
+    def remove(self, library_guid: str, media_paths: List[str]):
+        """
+        删除已出队且被扫描路径覆盖的记录，子路径在出队时已被上级目录合并
+        """
+        targets = {media_path.rstrip("/") for media_path in media_paths}
+        with self._lock:
+            if self._closed:
+                return
+            removed, kept = [], []
+            for media_path, entry_id in self._taken.get(library_guid, []):
+                (removed if self.__covered(media_path, targets) else kept).append((media_path, entry_id))
+            if not removed:
+                return
+            if kept:
+                self._taken[library_guid] = kept
+            else:
+                self._taken.pop(library_guid, None)
+            self._conn.executemany("DELETE FROM entries WHERE id = ?", [(entry_id,) for _, entry_id in removed])
+            self._conn.commit()
+
+    @staticmethod
+    def __covered(media_path: str, targets: set) -> bool:
+        """
+        路径本身或上级目录是否在扫描路径中
+        """
+        path = media_path.rstrip("/")
+        while path:
+            if path in targets:
+                return True
+            path = path.rsplit("/", 1)[0] if "/" in path else ""
+        return False
+
+    def load(self) -> List[Tuple[str, str, int]]:
+        """
+        加载所有已匹配媒体库、未扫描的记录
+        :return: (媒体库ID, 路径, 记录ID)
+        """
+        with self._lock:
+            if self._closed:
+                return []
+            self._taken = {}
+            return list(self._conn.execute("SELECT library_guid, path, id FROM entries WHERE library_guid != ? "
+                                           "ORDER BY id", (UNMATCHED_LIBRARY,)))
+
+    def load_unmatched(self) -> List[Tuple[str, int]]:
+        """
+        加载未匹配媒体库的记录
+        :return: (路径, 记录ID)
+        """
+        with self._lock:
+            if self._closed:
+                return []
+            return list(self._conn.execute("SELECT path, id FROM entries WHERE library_guid = ? ORDER BY id",
+                                           (UNMATCHED_LIBRARY,)))
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+
+
+class AdaptiveBatcher:
+    """
+    扫描请求分批大小控制
+    请求快速成功时逐步增大批次，响应变慢时按比例缩小，失败时减半
+    """
+
+    def __init__(self, initial: int = 50, minimum: int = 5, maximum: int = 500,
+                 target_latency: float = 3.0, step: int = 10):
+        """
+        :param initial: 初始批次大小
+        :param minimum: 最小批次大小
+        :param maximum: 最大批次大小
+        :param target_latency: 期望的单次请求耗时，单位秒
+        :param step: 每次增大的数量
+        """
+        self._size = initial
+        self._minimum = minimum
+        self._maximum = maximum
+        self._target_latency = target_latency
+        self._step = step
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def split(self, items: List[str]) -> List[List[str]]:
+        """
+        按当前批次大小切分
+        """
+        size = self._size
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    def record(self, latency: float, success: bool):
+        """
+        根据请求结果调整批次大小
+        :param latency: 请求耗时，单位秒
+        :param success: 是否成功
+        """
+        with self._lock:
+            if not success:
+                size = self._size // 2
+            elif latency > self._target_latency:
+                size = int(self._size * 0.75)
+            else:
+                size = self._size + self._step
+            self._size = max(self._minimum, min(self._maximum, size))
@@ -0,0 +1,125 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from app.log import logger
+
+
+class _DebounceTask:
+    """
+    防抖任务
+    """
+    __slots__ = ("deadline", "first", "func")
+
+    def __init__(self, deadline: float, first: float, func: Callable):
+        # 计划执行时间
+        self.deadline = deadline
+        # 本轮第一次触发时间，用于计算最长等待
+        self.first = first
+        self.func = func
+
+
+class DebounceScheduler:
+    """
+    防抖调度器
+    由一个常驻线程执行所有防抖任务，代替每次触发都新建线程的 threading.Timer；
+    支持最长等待时间，持续触发时也会在 max_wait 秒内执行一次
+    """
+
+    def __init__(self, name: str = "DebounceScheduler"):
+        self._name = name
+        self._cond = threading.Condition()
+        self._tasks: Dict[str, _DebounceTask] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        # 正在执行的任务标识
+        self._running: Optional[str] = None
+
+    def debounce(self, key: str, func: Callable, delay: float, max_wait: Optional[float] = None):
+        """
+        触发防抖任务，delay 秒内没有再次触发时执行 func
+        :param key: 任务标识，相同标识的触发会合并
+        :param func: 执行方法
+        :param delay: 防抖间隔，单位秒
+        :param max_wait: 最长等待时间，单位秒，为空时不限制
+        """
+        now = time.monotonic()
+        with self._cond:
+            if self._stopped:
+                return
+            task = self._tasks.get(key)
+            first = task.first if task else now
+            deadline = now + delay
+            if max_wait is not None:
+                deadline = min(deadline, first + max_wait)
+            self._tasks[key] = _DebounceTask(deadline, first, func)
+            self.__ensure_thread()
+            self._cond.notify()
+
+    def cancel(self, key: str):
+        """
+        取消尚未执行的任务
+        """
+        with self._cond:
+            self._tasks.pop(key, None)
+            self._cond.notify()
+
+    def pending(self, key: str) -> bool:
+        """
+        任务是否在等待执行
+        """
+        with self._cond:
+            return key in self._tasks
+
+    def active(self, key: str) -> bool:
+        """
+        任务是否在等待执行或正在执行
+        """
+        with self._cond:
+            return key in self._tasks or self._running == key
+
+    def shutdown(self, timeout: Optional[float] = 5):
+        """
+        停止调度线程，未执行的任务直接丢弃
+        :param timeout: 等待正在执行的任务结束的时间，单位秒
+        """
+        with self._cond:
+            self._stopped = True
+            self._tasks.clear()
+            self._cond.notify()
+        thread = self._thread
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+
+    def __ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self.__run, name=self._name, daemon=True)
+        self._thread.start()
+
+    def __run(self):
+        while True:
+            with self._cond:
+                task = None
+                while not self._stopped:
+                    if not self._tasks:
+                        self._cond.wait()
+                        continue
+                    key, task = min(self._tasks.items(), key=lambda item: item[1].deadline)
+                    timeout = task.deadline - time.monotonic()
+                    if timeout <= 0:
+                        del self._tasks[key]
+                        self._running = key
+                        break
+                    task = None
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+            try:
+                task.func()
+            except Exception as e:
+                logger.error(f"{self._name} 执行任务 {key} 失败：{str(e)}")
+            finally:
+                with self._cond:
+                    self._running = None
@@ -0,0 +1,573 @@
+"""
+飞牛扫描流程离线模拟
+
+在本地启动模拟的飞牛服务，按入库场景生成事件，统计扫描请求数、每次请求的路径数、
+入库到扫描的耗时以及丢失的路径。调整防抖、分批等参数后可以直接对比结果，不需要真实的飞牛。
+
+默认直接把飞牛媒体路径交给 ScanPipeline，只依赖 app.log，不经过插件的事件处理。
+--events 时改为构造 TransferComplete、DownloadFileDeleted 事件数据，交给插件的 refresh、on_event 处理，
+覆盖目录映射、扫描通道选择和删除路径解析（重命名缓存、按下载哈希查询整理记录、重新识别）；
+整理记录和重新识别使用模拟实现，统计两者的调用次数，需要完整的 MoviePilot 环境。
+插件配置中的防抖时间为整数秒，事件模式下会取整。
+
+在 MoviePilot 根目录运行：
+    python -m app.plugins.trimmediatool.simulate --scenario all --failure-rate 0.1
+    python -m app.plugins.trimmediatool.simulate --scenario all --events
+"""
+import argparse
+import bisect
+import json
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib import error, request
+
+from .metrics import ScanMetrics, percentile
+from .pathindex import split_path
+from .pipeline import LANE_BULK, LANE_FAST, ScanPipeline
+from .scheduler import DebounceScheduler
+
+# 模拟的媒体库
+LIBRARIES = [
+    {"guid": "lib-tv", "name": "电视剧", "dir_list": ["/vol1/media/tv"]},
+    {"guid": "lib-movie", "name": "电影", "dir_list": ["/vol1/media/movie"]},
+    {"guid": "lib-anime", "name": "动漫", "dir_list": ["/vol1/media/anime", "/vol2/anime"]},
+]
+# 事件模式的 MoviePilot 媒体目录到飞牛目录的映射
+MAP_DIRS = {
+    "/media/tv": "/vol1/media/tv",
+    "/media/movie": "/vol1/media/movie",
+    "/media/anime": "/vol1/media/anime",
+    "/media/anime2": "/vol2/anime",
+}
+# 事件模式中重新识别一个源文件的耗时（秒）
+RECOGNIZE_SECONDS = 0.05
+
+
+class FakeFnosServer:
+    """
+    模拟的飞牛服务
+    POST /mdb/scan/<guid> 接收扫描请求，媒体库在 scan_seconds 内显示为扫描中；
+    GET /task/running 返回扫描中的媒体库；GET /mdb/list 返回媒体库列表
+    """
+
+    def __init__(self, latency: Tuple[float, float] = (0.05, 0.2), failure_rate: float = 0.0,
+                 scan_seconds: float = 2.0, seed: Optional[int] = None):
+        """
+        :param latency: 扫描请求响应耗时范围，单位秒
+        :param failure_rate: 扫描请求失败的概率
+        :param scan_seconds: 每次扫描持续的时间，单位秒
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.scan_seconds = scan_seconds
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # 媒体库ID -> 扫描结束时间
+        self._running: Dict[str, float] = {}
+        # (收到时间, 媒体库ID, 路径列表)
+        self.scans: List[Tuple[float, str, List[str]]] = []
+        self.failures = 0
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.__handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def running(self) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            return [guid for guid, end in self._running.items() if end > now]
+
+    def scan(self, library_guid: str, media_paths: List[str]) -> bool:
+        with self._lock:
+            low, high = self.latency
+            delay = self._random.uniform(low, high)
+            failed = self._random.random() < self.failure_rate
+        time.sleep(delay)
+        with self._lock:
+            if failed:
+                self.failures += 1
+                return False
+            now = time.monotonic()
+            self.scans.append((now, library_guid, list(media_paths)))
+            self._running[library_guid] = max(self._running.get(library_guid, 0), now) + self.scan_seconds
+            return True
+
+    def __handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path == "/task/running":
+                    # 与飞牛一致：guid 是任务自身的ID，媒体库在 mdb_guid 中，同时混有非扫描任务
+                    tasks = [{"guid": f"task-{guid}", "type": "MdbScan", "mdb_guid": guid}
+                             for guid in server.running()]
+                    tasks.append({"guid": "task-thumb", "type": "Thumbnail", "mdb_guid": "lib-other"})
+                    self.__reply(200, {"code": 0, "data": tasks})
+                elif self.path == "/mdb/list":
+                    self.__reply(200, {"code": 0, "data": LIBRARIES})
+                else:
+                    self.__reply(404, {"code": -1, "msg": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.startswith("/mdb/scan/"):
+                    self.__reply(404, {"code": -1, "msg": "not found"})
+                    return
+                library_guid = self.path.rsplit("/", 1)[-1]
+                if server.scan(library_guid, body.get("dir_list") or []):
+                    self.__reply(200, {"code": 0, "data": True})
+                else:
+                    self.__reply(500, {"code": -1, "msg": "scan failed"})
+
+            def __reply(self, status: int, data: Any):
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class FakeApi:
+    """
+    模拟飞牛客户端的 api，接口与 ScanPipeline 使用的部分一致
+    """
+
+    def __init__(self, base_url: str, timeout: float = 10):
+        self._base_url = base_url
+        self._timeout = timeout
+
+    def request(self, path: str, method: str = "get", data: Optional[dict] = None):
+        body = json.dumps(data).encode() if data is not None else None
+        req = request.Request(self._base_url + path, data=body, method=method.upper(),
+                              headers={"Content-Type": "application/json"})
+        try:
+            with request.urlopen(req, timeout=self._timeout) as resp:
+                result = json.loads(resp.read())
+        except error.HTTPError as e:
+            result = json.loads(e.read() or b"{}")
+        return SimpleNamespace(success=result.get("code") == 0, data=result.get("data"))
+
+    def task_running(self) -> List[dict]:
+        res = self.request("/task/running")
+        return res.data if res.success else []
+
+    def mdb_list(self) -> List[SimpleNamespace]:
+        res = self.request("/mdb/list")
+        return [SimpleNamespace(**library) for library in res.data or []] if res.success else []
+
+
+def season_pack(rng: random.Random, shows: int = 3, episodes: int = 24) -> List[Tuple[float, str]]:
+    """
+    整季入库：每部剧的所有分集在几秒内连续入库
+    :return: (相对时间, 飞牛媒体路径)
+    """
+    events = []
+    for show in range(shows):
+        start = show * rng.uniform(0.5, 2)
+        for episode in range(episodes):
+            events.append((start + episode * rng.uniform(0.01, 0.1),
+                           f"/vol1/media/tv/Show {show} (2024)/Season 1"))
+    return events
+
+
+def bulk_reorganize(rng: random.Random, titles: int = 500, duration: float = 10) -> List[Tuple[float, str]]:
+    """
+    批量重新整理：大量不同媒体目录在一段时间内均匀入库
+    """
+    roots = ["/vol1/media/movie", "/vol1/media/anime", "/vol2/anime"]
+    return [(rng.uniform(0, duration), f"{rng.choice(roots)}/Title {title}") for title in range(titles)]
+
+
+def mass_delete(rng: random.Random, files: int = 300, duration: float = 3) -> List[Tuple[float, str]]:
+    """
+    批量删除源文件：同一批剧集的删除事件集中到达，大量重复路径
+    """
+    shows = [f"/vol1/media/tv/Deleted {index}" for index in range(20)]
+    return [(rng.uniform(0, duration), rng.choice(shows)) for _ in range(files)]
+
+
+def mixed(rng: random.Random, titles: int = 1000, episodes: int = 5,
+          duration: float = 20) -> List[Tuple[float, str, str]]:
+    """
+    批量整理期间有新播出的剧集单集入库，单集走快速通道；
+    批量整理中包含剧集媒体库的补档，新剧集所在的媒体库也在扫描中
+    """
+    events = [(offset, media_path, LANE_BULK)
+              for offset, media_path in bulk_reorganize(rng, titles=titles, duration=duration)]
+    events += [(rng.uniform(0, duration), f"/vol1/media/tv/Backfill {title}", LANE_BULK)
+               for title in range(titles // 5)]
+    events += [(rng.uniform(0, duration), f"/vol1/media/tv/Airing {episode}/Season 1", LANE_FAST)
+               for episode in range(episodes)]
+    return events
+
+
+SCENARIOS = {
+    "season": season_pack,
+    "bulk": bulk_reorganize,
+    "delete": mass_delete,
+    "mixed": mixed,
+}
+
+
+def run(scenario: str, server: FakeFnosServer, delay: float, max_wait: float, fast_delay: float = 0.2,
+        seed: Optional[int] = None, timeout: float = 120) -> Dict[str, Any]:
+    """
+    回放一个场景的事件，等待所有路径扫描完成后汇总结果
+    """
+    rng = random.Random(seed)
+    events = sorted(SCENARIOS[scenario](rng))
+    client = SimpleNamespace(api=FakeApi(server.url))
+    scheduler = DebounceScheduler(name=f"TrimMediaTool-sim-{scenario}")
+    metrics = ScanMetrics()
+    pipeline = ScanPipeline(get_client=lambda: client, scheduler=scheduler, metrics=metrics,
+                            delay_seconds=delay, max_wait_seconds=max_wait,
+                            fast_delay_seconds=fast_delay, fast_max_wait_seconds=fast_delay * 5, name=scenario)
+    _speed_up(pipeline)
+    scans_before = len(server.scans)
+
+    started = time.monotonic()
+    sent: List[Tuple[float, str, str]] = []
+    for offset, media_path, *lane in events:
+        lane = lane[0] if lane else LANE_BULK
+        wait = started + offset - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        sent.append((time.monotonic(), media_path, lane))
+        pipeline.enqueue(media_path, lane=lane)
+
+    _wait_idle([pipeline], timeout)
+    elapsed = time.monotonic() - started
+    pipeline.shutdown()
+    scheduler.shutdown()
+    result = _summarize(scenario, sent, server.scans[scans_before:], metrics)
+    result["elapsed"] = round(elapsed, 1)
+    return result
+
+
+def _speed_up(pipeline: ScanPipeline):
+    """
+    缩短轮询和重试间隔，加快模拟
+    """
+    pipeline.SCAN_POLL_SECONDS = 0.5
+    pipeline.SCAN_GRACE_SECONDS = 0.2
+    pipeline.SCAN_RETRY_BACKOFF = 0.1
+
+
+def _wait_idle(pipelines: List[ScanPipeline], timeout: float):
+    """
+    等待队列清空且没有扫描中的媒体库
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not all(pipeline.idle() for pipeline in pipelines):
+        time.sleep(0.1)
+
+
+def _summarize(scenario: str, sent: List[Tuple[float, str, str]], scans: List[Tuple[float, str, List[str]]],
+               metrics: ScanMetrics) -> Dict[str, Any]:
+    """
+    汇总扫描请求、每次请求的路径数、入队到扫描的耗时和丢失的路径
+    :param sent: (入队时间, 飞牛媒体路径, 通道)
+    """
+    # 路径 -> 被扫描的时间
+    scanned: Dict[Tuple[str, ...], List[float]] = {}
+    for received, _, media_paths in scans:
+        for media_path in media_paths:
+            scanned.setdefault(split_path(media_path), []).append(received)
+    latencies: Dict[str, List[float]] = {}
+    lost = set()
+    for enqueued, media_path, lane in sent:
+        covered = _first_covered(scanned, split_path(media_path), enqueued)
+        if covered is None:
+            lost.add(media_path)
+        else:
+            latencies.setdefault(lane, []).append(covered - enqueued)
+    paths_per_request = [len(media_paths) for _, _, media_paths in scans]
+    counters = metrics.snapshot()["counters"]
+    return {
+        "scenario": scenario,
+        "events": len(sent),
+        "unique_paths": len({media_path for _, media_path, _ in sent}),
+        "requests": len(scans),
+        "deduplicated": counters.get("deduplicated", 0),
+        # 媒体库扫描中时暂存的路径数，为 0 说明没有识别到飞牛的扫描任务
+        "held": counters.get("held", 0),
+        "paths_per_request": {
+            "avg": round(sum(paths_per_request) / len(paths_per_request), 1) if paths_per_request else 0,
+            "max": max(paths_per_request, default=0),
+        },
+        "latency": {
+            lane: {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": round(max(values, default=0), 3),
+            } for lane, values in latencies.items()
+        },
+        "lost": sorted(lost),
+    }
+
+
+def to_mp_path(media_path: str) -> str:
+    """
+    飞牛媒体路径转换为 MoviePilot 媒体路径，插件通过映射配置再转换回来
+    """
+    for mp_dir, fn_dir in sorted(MAP_DIRS.items(), key=lambda item: len(item[1]), reverse=True):
+        if media_path == fn_dir or media_path.startswith(f"{fn_dir}/"):
+            return mp_dir + media_path[len(fn_dir):]
+    return media_path
+
+
+class FakeServerHelper:
+    """
+    模拟的媒体服务器帮助类，返回一个连接到模拟飞牛服务的媒体服务器
+    """
+
+    def __init__(self, base_url: str):
+        instance = SimpleNamespace(api=FakeApi(base_url), is_inactive=lambda: False, reconnect=lambda: None)
+        self._service = SimpleNamespace(name="fnos-sim", instance=instance)
+
+    def get_configs(self) -> Dict[str, Any]:
+        return {"fnos-sim": SimpleNamespace(name="fnos-sim", type="trimemedia")}
+
+    def get_service(self, name: str):
+        return self._service if name == self._service.name else None
+
+
+class FakeTransferHistory:
+    """
+    模拟的整理记录，按下载哈希返回种子所有文件的整理记录，统计查询次数
+    """
+
+    def __init__(self):
+        # 下载哈希 -> 整理记录
+        self.histories: Dict[str, List[SimpleNamespace]] = {}
+        self.queries = 0
+        self._lock = threading.Lock()
+
+    def list_by_hash(self, download_hash: str) -> List[SimpleNamespace]:
+        with self._lock:
+            self.queries += 1
+        return self.histories.get(download_hash, [])
+
+
+def transfer_events(rng: random.Random, scenario: str) -> List[Tuple[float, str, str, dict]]:
+    """
+    将场景中的路径转换为整理入库事件数据
+    快速通道的路径构造为最近播出的单集，整季入库构造为文件数较多的入库，由插件判断扫描通道
+    :return: (相对时间, 飞牛媒体路径, 预期通道, 事件数据)
+    """
+    from app.schemas.types import MediaType
+
+    recent = (date.today() - timedelta(days=1)).isoformat()
+    events = []
+    for index, (offset, media_path, *lane) in enumerate(SCENARIOS[scenario](rng)):
+        lane = lane[0] if lane else LANE_BULK
+        is_tv = media_path.startswith(MAP_DIRS["/media/tv"])
+        if lane == LANE_FAST:
+            file_count, air_date = 1, recent
+        elif scenario == "season":
+            # 最近播出但整季入库，走批量通道
+            file_count, air_date = 24, recent
+        else:
+            file_count, air_date = 1, "2015-06-01"
+        mp_path = to_mp_path(media_path)
+        event_data = {
+            "transferinfo": SimpleNamespace(target_diritem=SimpleNamespace(path=mp_path), file_count=file_count),
+            "mediainfo": SimpleNamespace(type=MediaType.TV if is_tv else MediaType.MOVIE,
+                                         tmdb_info={"last_air_date": air_date}),
+            "fileitem": SimpleNamespace(path=f"/downloads/{Path(mp_path).name}/file{index}.mkv"),
+            "download_hash": f"hash-{scenario}-{index}",
+        }
+        events.append((offset, media_path, lane, {"transfer": event_data}))
+    return events
+
+
+def delete_events(rng: random.Random, history: FakeTransferHistory) -> List[Tuple[float, str, str, dict]]:
+    """
+    批量删除源文件：每部剧一个种子，删除事件集中到达
+    三分之一的种子之前整理入库过，删除路径在重命名缓存中；三分之一只有整理记录；
+    其余没有整理记录，需要重新识别
+    """
+    events = []
+    for offset, media_path in mass_delete(rng):
+        show = Path(media_path).name
+        index = int(show.rsplit(" ", 1)[-1])
+        download_hash = f"hash-delete-{index}"
+        src = f"/downloads/{show}/E{rng.randint(1, 24):02d}.mkv"
+        events.append((offset, media_path, LANE_BULK, {"delete": {"hash": download_hash, "src": src}}))
+    shows = sorted({media_path for _, media_path, _, _ in events})
+    for media_path in shows:
+        show = Path(media_path).name
+        index = int(show.rsplit(" ", 1)[-1])
+        download_hash = f"hash-delete-{index}"
+        mp_path = to_mp_path(media_path)
+        if index % 3 == 0:
+            # 之前的整理入库，删除时命中重命名缓存
+            event_data = {
+                "transferinfo": SimpleNamespace(target_diritem=SimpleNamespace(path=mp_path), file_count=24),
+                "mediainfo": None,
+                "fileitem": SimpleNamespace(path=f"/downloads/{show}/E01.mkv"),
+                "download_hash": download_hash,
+            }
+            events.append((0, media_path, LANE_BULK, {"transfer": event_data}))
+        elif index % 3 == 1:
+            history.histories[download_hash] = [
+                SimpleNamespace(status=True, src=f"/downloads/{show}/E{episode:02d}.mkv",
+                                dest=f"{mp_path}/Season 1/{show} - S01E{episode:02d}.mkv", type="电视剧")
+                for episode in range(1, 25)
+            ]
+    return events
+
+
+def run_events(scenario: str, server: FakeFnosServer, delay: float, max_wait: float, fast_delay: float = 0.2,
+               seed: Optional[int] = None, timeout: float = 120) -> Dict[str, Any]:
+    """
+    通过插件的事件处理回放一个场景，等待所有路径扫描完成后汇总结果
+    """
+    from . import TrimMediaTool
+
+    rng = random.Random(seed)
+    history = FakeTransferHistory()
+    if scenario == "delete":
+        events = sorted(delete_events(rng, history), key=lambda event: event[0])
+    else:
+        events = sorted(transfer_events(rng, scenario), key=lambda event: event[0])
+    recognized: List[str] = []
+
+    def get_rename_dir(src: str) -> Optional[Path]:
+        # 重新识别媒体的模拟实现，按源文件所在目录得到剧集目录
+        time.sleep(RECOGNIZE_SECONDS)
+        recognized.append(src)
+        return Path(to_mp_path(f"/vol1/media/tv/{Path(src).parent.name}"))
+
+    data_dir = tempfile.TemporaryDirectory()
+    store: Dict[str, Any] = {}
+    plugin = TrimMediaTool.__new__(TrimMediaTool)
+    plugin.get_data = lambda key: store.get(key)
+    plugin.save_data = lambda key, value: store.__setitem__(key, value)
+    plugin.get_data_path = lambda: Path(data_dir.name)
+    plugin.get_rename_dir = get_rename_dir
+    plugin._server_helper = FakeServerHelper(server.url)
+    plugin._transferhis = history
+    plugin.init_plugin({
+        "enabled": True,
+        "media_map_dirs": "\n".join(f"{mp_dir}:{fn_dir}" for mp_dir, fn_dir in MAP_DIRS.items()),
+        "delay_seconds": max(int(delay), 1),
+        "max_wait_seconds": max(int(max_wait), 1),
+        "fast_delay_seconds": int(fast_delay),
+    })
+    pipelines = list(plugin._pipelines.values())
+    for pipeline in pipelines:
+        _speed_up(pipeline)
+    # 等待媒体库索引加载
+    _wait_idle(pipelines, timeout)
+    scans_before = len(server.scans)
+
+    started = time.monotonic()
+    sent: List[Tuple[float, str, str]] = []
+    for offset, media_path, lane, payload in events:
+        wait = started + offset - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        sent.append((time.monotonic(), media_path, lane))
+        if "transfer" in payload:
+            plugin.refresh(SimpleNamespace(event_data=payload["transfer"]))
+        else:
+            plugin.on_event(SimpleNamespace(event_data=payload["delete"]))
+    dispatched = time.monotonic() - started
+
+    _wait_idle(pipelines, timeout)
+    elapsed = time.monotonic() - started
+    metrics = plugin._metrics
+    plugin.stop_service()
+    data_dir.cleanup()
+    result = _summarize(scenario, sent, server.scans[scans_before:], metrics)
+    counters = metrics.snapshot()["counters"]
+    result["lanes"] = {lane: counters.get(f"enqueued_{lane}", 0) for lane in (LANE_FAST, LANE_BULK)}
+    result["expected_lanes"] = {lane: sum(1 for _, _, sent_lane in sent if sent_lane == lane)
+                                for lane in (LANE_FAST, LANE_BULK)}
+    if scenario == "delete":
+        result["resolve"] = {
+            "deletes": sum(1 for *_, payload in events if "delete" in payload),
+            "history_queries": history.queries,
+            "recognized": len(recognized),
+        }
+    # 事件处理线程的总耗时，包括删除路径解析
+    result["dispatch"] = round(dispatched, 1)
+    result["elapsed"] = round(elapsed, 1)
+    return result
+
+
+def _first_covered(scanned: Dict[Tuple[str, ...], List[float]], parts: Tuple[str, ...],
+                    enqueued: float) -> Optional[float]:
+    """
+    查找路径本身或上级目录在入队后第一次被扫描的时间
+    """
+    first = None
+    for depth in range(1, len(parts) + 1):
+        times = scanned.get(parts[:depth])
+        if not times:
+            continue
+        times.sort()
+        index = bisect.bisect_left(times, enqueued)
+        if index < len(times) and (first is None or times[index] < first):
+            first = times[index]
+    return first
+
+
+def main():
+    parser = argparse.ArgumentParser(description="飞牛扫描流程离线模拟")
+    parser.add_argument("--scenario", choices=[*SCENARIOS, "all"], default="all")
+    parser.add_argument("--delay", type=float, default=1, help="防抖间隔（秒）")
+    parser.add_argument("--max-wait", type=float, default=5, help="最长等待时间（秒）")
+    parser.add_argument("--fast-delay", type=float, default=0.2, help="快速通道防抖间隔（秒）")
+    parser.add_argument("--latency", type=float, nargs=2, default=(0.05, 0.2), help="扫描请求响应耗时范围（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="扫描请求失败的概率")
+    parser.add_argument("--scan-seconds", type=float, default=2, help="每次扫描持续的时间（秒）")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--events", action="store_true", help="通过插件的事件处理回放，需要 MoviePilot 环境")
+    args = parser.parse_args()
+
+    server = FakeFnosServer(latency=tuple(args.latency), failure_rate=args.failure_rate,
+                            scan_seconds=args.scan_seconds, seed=args.seed)
+    server.start()
+    try:
+        scenarios = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+        for scenario in scenarios:
+            result = (run_events if args.events else run)(scenario, server, delay=args.delay,
+                                                          max_wait=args.max_wait, fast_delay=args.fast_delay,
+                                                          seed=args.seed)
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+        print(f"模拟服务共拒绝 {server.failures} 次扫描请求")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
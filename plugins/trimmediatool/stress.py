@@ -0,0 +1,107 @@
+"""
+扫描队列并发压力测试
+
+多个线程同时写入路径，一个线程持续取出，检查每个路径都被取出且只取出一次。
+开启 --journal 时同时写入持久化日志，全部扫描完成后日志应为空。
+
+在 MoviePilot 根目录运行：
+    python -m app.plugins.trimmediatool.stress --threads 16 --paths 5000
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+from .scanqueue import ScanJournal, ScanQueue
+
+LIBRARIES = ["lib-tv", "lib-movie", "lib-anime"]
+
+
+def run(threads: int, paths: int, journal: bool = False) -> Dict[str, int]:
+    """
+    执行一次压力测试
+    :param threads: 写入线程数
+    :param paths: 每个线程写入的路径数
+    :param journal: 是否使用持久化日志
+    :return: 统计结果
+    """
+    tmpdir = tempfile.TemporaryDirectory() if journal else None
+    scan_journal = ScanJournal(Path(tmpdir.name) / "scan_queue.db") if tmpdir else None
+    queue = ScanQueue(scan_journal)
+    received: Counter = Counter()
+    drains = 0
+    producers_done = threading.Event()
+    start = threading.Barrier(threads + 1)
+
+    def produce(index: int):
+        start.wait()
+        for i in range(paths):
+            library = LIBRARIES[i % len(LIBRARIES)]
+            queue.put(library, f"/vol1/media/t{index}/e{i}.mkv")
+
+    def consume():
+        nonlocal drains
+        start.wait()
+        while True:
+            finished = producers_done.is_set()
+            batch = queue.drain()
+            if batch:
+                drains += 1
+            for library, trie in batch.items():
+                batch_paths: List[str] = list(trie.paths())
+                for path in batch_paths:
+                    received[(library, path)] += 1
+                queue.done(library, batch_paths)
+            if finished and not queue:
+                break
+            if not batch:
+                time.sleep(0.001)
+
+    workers = [threading.Thread(target=produce, args=(i,)) for i in range(threads)]
+    consumer = threading.Thread(target=consume)
+    began = time.perf_counter()
+    consumer.start()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    producers_done.set()
+    consumer.join()
+    elapsed = time.perf_counter() - began
+
+    expected = threads * paths
+    result = {
+        "expected": expected,
+        "received": len(received),
+        "duplicated": sum(1 for count in received.values() if count > 1),
+        "missing": expected - len(received),
+        "drains": drains,
+        "elapsed_ms": int(elapsed * 1000),
+    }
+    if scan_journal:
+        result["journal_left"] = len(scan_journal.load())
+        scan_journal.close()
+        tmpdir.cleanup()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="扫描队列并发压力测试")
+    parser.add_argument("--threads", type=int, default=16, help="写入线程数")
+    parser.add_argument("--paths", type=int, default=5000, help="每个线程写入的路径数")
+    parser.add_argument("--journal", action="store_true", help="同时写入持久化日志")
+    args = parser.parse_args()
+
+    result = run(args.threads, args.paths, journal=args.journal)
+    print(result)
+    ok = not result["missing"] and not result["duplicated"] and not result.get("journal_left")
+    print("通过" if ok else "失败")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import errno
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
+
+from app.log import logger
+
+from .pathindex import PathTrie
+from .scheduler import DebounceScheduler
+
+# inotify 监视数量达到系统上限时的错误
+_WATCH_LIMIT_ERRORS = (errno.ENOSPC, errno.EMFILE)
+# 视为目录变化的事件，closed 是写入后关闭文件（IN_CLOSE_WRITE），复制完成时触发
+_CHANGE_EVENTS = ("created", "deleted", "moved", "closed")
+
+
+def _max_user_watches() -> Optional[int]:
+    """
+    读取系统 inotify 监视数量上限
+    """
+    try:
+        with open("/proc/sys/fs/inotify/max_user_watches") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _count_dirs(root: str, limit: int) -> int:
+    """
+    统计根目录下的目录数量，超过 limit 时提前返回
+    """
+    count = 0
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        count += 1
+        if count > limit:
+            break
+        try:
+            with os.scandir(path) as entries:
+                stack.extend(entry.path for entry in entries if entry.is_dir(follow_symlinks=False))
+        except OSError:
+            continue
+    return count
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """
+    将文件事件转换为所在目录
+    文件写入期间持续触发 modified 事件：inotify 监控只用它推迟合并回调，写入完成由 closed 事件发现；
+    轮询监控没有 closed 事件，modified 视为变化
+    """
+
+    def __init__(self, on_dir: Callable[[str], None], on_write: Optional[Callable[[], None]] = None):
+        """
+        :param on_dir: 目录变化回调
+        :param on_write: 文件写入回调，为空时文件的 modified 事件视为变化
+        """
+        super().__init__()
+        self._on_dir = on_dir
+        self._on_write = on_write
+
+    def on_any_event(self, event: FileSystemEvent):
+        if event.event_type == "modified" and not event.is_directory:
+            if self._on_write:
+                self._on_write()
+                return
+        elif event.event_type not in _CHANGE_EVENTS:
+            return
+        for path in (event.src_path, getattr(event, "dest_path", None)):
+            if not path or os.path.basename(path).startswith("."):
+                continue
+            self._on_dir(path if event.is_directory else os.path.dirname(path))
+
+
+class DirectoryWatcher:
+    """
+    目录监控
+    短时间内的创建、移动、删除和写入事件按目录合并后统一回调，回调时附带目录最后一次变化的时间；
+    目录数量超过监视上限或 inotify 监视数量不足时，该根目录改用轮询监控，
+    运行中目录增多导致 inotify 监控失效时也会切换为轮询
+    """
+
+    # 轮询监控的间隔（秒）
+    POLLING_INTERVAL = 300
+    # 检查 inotify 监控是否失效的间隔（秒）
+    CHECK_INTERVAL = 60
+
+    def __init__(self, roots: List[str], on_change: Callable[[str, float], None], scheduler: DebounceScheduler,
+                 delay_seconds: float = 10, max_wait_seconds: float = 60, max_watches: int = 50000):
+        """
+        :param roots: 监控的根目录
+        :param on_change: 目录变化回调，参数为目录和最后一次变化的 time.monotonic() 时间
+        :param scheduler: 防抖调度器
+        :param delay_seconds: 合并事件的防抖间隔，单位秒
+        :param max_wait_seconds: 持续有事件时最长等待时间，单位秒
+        :param max_watches: 使用 inotify 时最多监视的目录数量
+        """
+        self._roots = roots
+        self._on_change = on_change
+        self._scheduler = scheduler
+        self._delay_seconds = delay_seconds
+        self._max_wait_seconds = max_wait_seconds
+        system_limit = _max_user_watches()
+        # 给系统中的其他程序保留一半的监视数量
+        self._max_watches = min(max_watches, system_limit // 2) if system_limit else max_watches
+        self._lock = threading.Lock()
+        self._changes = PathTrie()
+        # 目录 -> 最后一次变化的时间
+        self._changed_at: Dict[str, float] = {}
+        self._handler = _ChangeHandler(self.__add_change, on_write=self.__extend)
+        self._polling_handler = _ChangeHandler(self.__add_change)
+        # 根目录 -> 监控器
+        self._observers: Dict[str, object] = {}
+        self._stopped = False
+        # 根目录 -> 监控方式
+        self.modes: Dict[str, str] = {}
+
+    def start(self):
+        """
+        开始监控，统计目录数量和启动监控在调度线程中执行，不阻塞插件加载
+        """
+        self._stopped = False
+        self._scheduler.debounce("watch_start", self.__start, delay=0)
+
+    def __start(self):
+        """
+        启动各根目录的监控，目录数量已占用的 inotify 监视数量按根目录累计
+        """
+        budget = self._max_watches
+        for root in self._roots:
+            if self._stopped:
+                return
+            if not os.path.isdir(root):
+                logger.warning(f"监控目录 {root} 不存在，跳过")
+                continue
+            dirs = _count_dirs(root, budget)
+            if dirs <= budget and self.__schedule(Observer(), root):
+                budget -= dirs
+                self.modes[root] = "inotify"
+                continue
+            logger.info(f"监控目录 {root} 目录数量超过监视上限或 inotify 不可用，改用轮询监控")
+            self.__start_polling(root)
+        self.__schedule_check()
+
+    def stop(self):
+        """
+        停止监控，丢弃尚未回调的变化
+        """
+        self._stopped = True
+        for key in ("watch", "watch_start", "watch_check"):
+            self._scheduler.cancel(key)
+        for observer in list(self._observers.values()):
+            self.__stop_observer(observer)
+        self._observers = {}
+        self.modes = {}
+
+    def __start_polling(self, root: str):
+        if self.__schedule(PollingObserver(timeout=self.POLLING_INTERVAL), root, self._polling_handler):
+            self.modes[root] = "polling"
+
+    def __schedule_check(self):
+        if not self._stopped and "inotify" in self.modes.values():
+            self._scheduler.debounce("watch_check", self.__check, delay=self.CHECK_INTERVAL)
+
+    def __check(self):
+        """
+        检查 inotify 监控是否仍在运行
+        新建目录时监视数量不足会使监控线程异常退出且不会报错，此时该根目录改用轮询监控
+        """
+        for root, mode in list(self.modes.items()):
+            if self._stopped:
+                return
+            observer = self._observers.get(root)
+            if mode != "inotify" or observer is None:
+                continue
+            if self.__alive(observer):
+                continue
+            logger.warning(f"监控目录 {root} 的 inotify 监控已失效，可能是监视数量不足，改用轮询监控")
+            self.__stop_observer(observer)
+            self._observers.pop(root, None)
+            self.modes.pop(root, None)
+            self.__start_polling(root)
+        self.__schedule_check()
+
+    def __schedule(self, observer, root: str, handler: Optional[_ChangeHandler] = None) -> bool:
+        try:
+            observer.schedule(handler or self._handler, root, recursive=True)
+            observer.daemon = True
+            observer.start()
+        except OSError as e:
+            if e.errno in _WATCH_LIMIT_ERRORS:
+                logger.warning(f"监控目录 {root} 时 inotify 监视数量不足：{str(e)}")
+            else:
+                logger.error(f"监控目录 {root} 失败：{str(e)}")
+            try:
+                observer.stop()
+            except Exception:
+                pass
+            return False
+        self._observers[root] = observer
+        if self._stopped:
+            # 启动期间插件已停止
+            self.__stop_observer(observer)
+            self._observers.pop(root, None)
+            return False
+        return True
+
+    @staticmethod
+    def __alive(observer) -> bool:
+        """
+        监控器及其各根目录的监控线程是否都在运行
+        """
+        try:
+            emitters = list(observer.emitters)
+        except RuntimeError:
+            # 监控器正在修改监控列表，下次再检查
+            return True
+        return observer.is_alive() and all(emitter.is_alive() for emitter in emitters)
+
+    @staticmethod
+    def __stop_observer(observer):
+        try:
+            observer.stop()
+            observer.join(timeout=5)
+        except Exception as e:
+            logger.debug(f"停止目录监控失败：{str(e)}")
+
+    def __add_change(self, path: str):
+        with self._lock:
+            self._changes.add(path)
+            self._changed_at[path.rstrip("/")] = time.monotonic()
+        self._scheduler.debounce("watch", self.__flush,
+                                 delay=self._delay_seconds, max_wait=self._max_wait_seconds)
+
+    def __extend(self):
+        """
+        有文件正在写入，推迟尚未回调的变化，最长等待时间不变
+        """
+        if self._changes:
+            self._scheduler.debounce("watch", self.__flush,
+                                     delay=self._delay_seconds, max_wait=self._max_wait_seconds)
+
+    def __flush(self):
+        with self._lock:
+            changes, self._changes = self._changes, PathTrie()
+            changed_at, self._changed_at = self._changed_at, {}
+        if not changes:
+            return
+        logger.info(f"目录监控发现 {len(changes)} 个目录变化，合并了 {changes.merged} 个事件")
+        for path, last_changed in self.__last_changed(changes.paths(), changed_at):
+            try:
+                self._on_change(path, last_changed)
+            except Exception as e:
+                logger.error(f"处理目录变化 {path} 失败：{str(e)}")
+
+    @staticmethod
+    def __last_changed(paths: List[str], changed_at: Dict[str, float]) -> List[Tuple[str, float]]:
+        """
+        计算合并后各目录及其子目录最后一次变化的时间
+        """
+        latest = {path.rstrip("/"): 0.0 for path in paths}
+        for changed, at in changed_at.items():
+            path = changed
+            while path:
+                if path in latest:
+                    latest[path] = max(latest[path], at)
+                    break
+                path = path.rsplit("/", 1)[0] if "/" in path else ""
+        return [(path, latest[path.rstrip("/")]) for path in paths]